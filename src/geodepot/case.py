@@ -1,3 +1,4 @@
+from copy import deepcopy
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Self, NewType
@@ -45,7 +46,7 @@ class CaseSpec:
         return CaseSpec(*casespec.split("/"))
 
 
-@dataclass(repr=True, order=True)
+@dataclass(repr=True)
 class Case:
     """A test case.
 
@@ -91,6 +92,27 @@ class Case:
         self.changed_by = get_current_user()
         return self.data.pop(name, None)
 
+    def __deepcopy__(self, memo) -> Self:
+        # The name, description and sha1 are str, which can be shared
+        return Case(
+            name=self.name,
+            description=self.description,
+            sha1=self.sha1,
+            data={name: deepcopy(data, memo) for name, data in self.data.items()},
+            changed_by=deepcopy(self.changed_by, memo),
+        )
+
+    def shallow_clone(self) -> Self:
+        """A copy of the Case with its own data register, but sharing the Data items
+        and the User with the original."""
+        return Case(
+            name=self.name,
+            description=self.description,
+            sha1=self.sha1,
+            data=dict(self.data),
+            changed_by=self.changed_by,
+        )
+
     def to_pretty(self) -> str:
         output = [
             f"NAME={self.name}",
@@ -1,6 +1,7 @@
 from logging import getLogger, basicConfig, DEBUG, INFO
 
 from click import (
+    Group,
     group,
     command,
     pass_context,
@@ -28,7 +29,22 @@ def abort_if_false(ctx, param, value):
         ctx.abort()
 
 
-@group()
+class GeodepotGroup(Group):
+    """Report an invalid repository without a traceback.
+
+    The repository is opened in `get_repository`, but its index is only loaded when
+    it is first accessed by a command, so an invalid index is reported here.
+    """
+
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except GeodepotInvalidRepository as e:
+            ctx.obj["logger"].critical(e)
+            ctx.exit(1)
+
+
+@group(cls=GeodepotGroup)
 @version_option()
 @option(
     "--verbose",
@@ -61,8 +77,23 @@ def geodepot_grp(ctx, verbose):
     default=False,
     help="Add a whole directory as a single data entry.",
 )
+@option(
+    "--las-header-extent",
+    is_flag=True,
+    default=False,
+    help="Take the extent of LAS/LAZ files from their header instead of computing it from the points.",
+)
 @pass_context
-def add_cmd(ctx, casespec, path, data_license, description, data_format, as_data):
+def add_cmd(
+    ctx,
+    casespec,
+    path,
+    data_license,
+    description,
+    data_format,
+    as_data,
+    las_header_extent,
+):
     repo = get_repository(ctx)
     if path is not None:
         for p in path:
@@ -73,6 +104,7 @@ def add_cmd(ctx, casespec, path, data_license, description, data_format, as_data
                 description=description,
                 format=data_format,
                 as_data=as_data,
+                las_header_extent=las_header_extent,
             )
     else:
         repo.add(
@@ -81,6 +113,7 @@ def add_cmd(ctx, casespec, path, data_license, description, data_format, as_data
             description=description,
             format=data_format,
             as_data=as_data,
+            las_header_extent=las_header_extent,
         )
 
 
@@ -142,14 +175,14 @@ def config_set_cmd(ctx, name, value, global_config):
 @argument("name")
 @pass_context
 def fetch_cmd(ctx, name):
-    repo = get_repository(ctx)
-    diff_all = repo.fetch(remote=RemoteName(name))
-    if len(diff_all) > 0:
-        ctx.obj["logger"].info("\n" + format_indexdiffs(diff_all))
-    else:
-        ctx.obj["logger"].info(
-            f"No changes detected between the remote '{name}' and the local repository."
-        )
+    with get_repository(ctx) as repo:
+        diff_all = repo.fetch(remote=RemoteName(name))
+        if len(diff_all) > 0:
+            ctx.obj["logger"].info("\n" + format_indexdiffs(diff_all))
+        else:
+            ctx.obj["logger"].info(
+                f"No changes detected between the remote '{name}' and the local repository."
+            )
 
 
 @command(name="get", help="Return the full local path to the specified data item.")
@@ -200,22 +233,22 @@ def list_cmd(ctx):
 )
 @pass_context
 def pull_cmd(ctx, name, force_yes):
-    repo = get_repository(ctx)
-    diff_all = repo.fetch(remote=RemoteName(name))
-    if len(diff_all) == 0:
-        ctx.obj["logger"].info("No changes detected. Exiting.")
-        return True
-    ctx.obj["logger"].info("\n\n" + format_indexdiffs(diff_all, push=False))
-    if force_yes:
-        yes_input = True
-    else:
-        yes_input = input(
-            f"The local differs from the remote '{name}' repository in the details listed above. Do you want to overwrite the local with the remote data? [y/n]: "
-        ).lower() in ("y", "yes")
-    if yes_input:
-        repo.pull(remote_name=RemoteName(name), diff_all=diff_all)
-    else:
-        ctx.obj["logger"].info("Exiting without pulling the remote changes.")
+    with get_repository(ctx) as repo:
+        diff_all = repo.fetch(remote=RemoteName(name))
+        if len(diff_all) == 0:
+            ctx.obj["logger"].info("No changes detected. Exiting.")
+            return True
+        ctx.obj["logger"].info("\n\n" + format_indexdiffs(diff_all, push=False))
+        if force_yes:
+            yes_input = True
+        else:
+            yes_input = input(
+                f"The local differs from the remote '{name}' repository in the details listed above. Do you want to overwrite the local with the remote data? [y/n]: "
+            ).lower() in ("y", "yes")
+        if yes_input:
+            repo.pull(remote_name=RemoteName(name), diff_all=diff_all)
+        else:
+            ctx.obj["logger"].info("Exiting without pulling the remote changes.")
 
 
 @command(
@@ -231,24 +264,31 @@ def pull_cmd(ctx, name, force_yes):
     default=False,
     help="Skip confirmation before overwriting the remote.",
 )
+@option(
+    "--force",
+    "force",
+    is_flag=True,
+    default=False,
+    help="Also upload the modified data whose contents did not change.",
+)
 @pass_context
-def push_cmd(ctx, name, force_yes):
-    repo = get_repository(ctx)
-    diff_all = repo.fetch(remote=RemoteName(name))
-    if len(diff_all) == 0:
-        ctx.obj["logger"].info("No changes detected. Exiting.")
-        return True
-    ctx.obj["logger"].info("\n\n" + format_indexdiffs(diff_all, push=True))
-    if force_yes:
-        yes_input = True
-    else:
-        yes_input = input(
-            f"The remote '{name}' differs from the local repository in the details listed above. Do you want to overwrite the remote with the local data? [y/n]: "
-        ).lower() in ("y", "yes")
-    if yes_input:
-        repo.push(remote_name=RemoteName(name), diff_all=diff_all)
-    else:
-        ctx.obj["logger"].info("Exiting without pushing the local changes.")
+def push_cmd(ctx, name, force_yes, force):
+    with get_repository(ctx) as repo:
+        diff_all = repo.fetch(remote=RemoteName(name))
+        if len(diff_all) == 0:
+            ctx.obj["logger"].info("No changes detected. Exiting.")
+            return True
+        ctx.obj["logger"].info("\n\n" + format_indexdiffs(diff_all, push=True))
+        if force_yes:
+            yes_input = True
+        else:
+            yes_input = input(
+                f"The remote '{name}' differs from the local repository in the details listed above. Do you want to overwrite the remote with the local data? [y/n]: "
+            ).lower() in ("y", "yes")
+        if yes_input:
+            repo.push(remote_name=RemoteName(name), diff_all=diff_all, force=force)
+        else:
+            ctx.obj["logger"].info("Exiting without pushing the local changes.")
 
 
 @group(name="remote", help="Connect an existing remote Geodepot repository.")
@@ -286,13 +326,14 @@ def remote_remove_cmd(ctx, name):
     remote_remove(name)
 
 
-@command(name="remove", help="Delete a case or a data item from the repository.")
-@argument("casespec")
+@command(name="remove", help="Delete cases or data items from the repository.")
+@argument("casespec", nargs=-1, required=True)
 @pass_context
 def remove_cmd(ctx, casespec):
-    cs = CaseSpec.from_str(casespec)
     repo = get_repository(ctx)
-    repo.remove(cs)
+    with repo.batch():
+        for cs in casespec:
+            repo.remove(CaseSpec.from_str(cs))
 
 
 @command(name="show", help="Show the details of a data item.")
@@ -1,16 +1,22 @@
 from dataclasses import dataclass
-from json import dumps, load, loads, JSONEncoder
+from functools import cached_property
+from json import JSONEncoder, dumps
 from logging import getLogger
 from pathlib import Path
-from typing import Self, NewType
+from typing import NewType, Self
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
 
 from geodepot import (
+    GEODEPOT_CASES,
     GEODEPOT_CONFIG_GLOBAL,
     GEODEPOT_CONFIG_LOCAL,
     GEODEPOT_INDEX,
-    GEODEPOT_CASES,
 )
-from geodepot.encode import DataClassEncoder
+from geodepot.encode import DataClassEncoder, dataclass_to_dict
 from geodepot.errors import GeodepotInvalidConfiguration
 
 logger = getLogger(__name__)
@@ -24,7 +30,7 @@ class User:
     email: str | None = None
 
     def to_json(self) -> str:
-        return dumps(self, cls=DataClassEncoder, indent=JSON_INDENT)
+        return dumps(dataclass_to_dict(self), indent=JSON_INDENT)
 
     def to_pretty(self) -> str:
         return f"{self.name} <{self.email}>"
@@ -92,7 +98,7 @@ class Remote:
     def __str__(self):
         return f"{self.name} {self.url}"
 
-    @property
+    @cached_property
     def path_index(self):
         """Path to the remote index file. If the remote is SSH, then this is the path
         on the remote filesystem. If the remote is HTTP, then this is the URL with the
@@ -107,7 +113,7 @@ class Remote:
         else:
             return "/".join([self.url, GEODEPOT_INDEX])
 
-    @property
+    @cached_property
     def path_cases(self):
         """Path to the remote cases directory. If the remote is SSH, then this is the
         path on the remote filesystem. If the remote is HTTP, then this is the URL with
@@ -124,7 +130,7 @@ class Remote:
 
     def to_json(self) -> str:
         """Serialize the remote to a JSON string."""
-        return dumps(self, cls=DataClassEncoder, indent=JSON_INDENT)
+        return dumps(dataclass_to_dict(self), indent=JSON_INDENT)
 
 
 def as_remote(dct: dict) -> Remote | dict:
@@ -142,23 +148,28 @@ class Config:
     @classmethod
     def load(cls, path: Path) -> Self:
         logger.debug(f"Reading config from file: {path}")
-        with path.open() as f:
-            c = load(f, object_hook=as_config)
-            # An empty config is serialized as an empty JSON object '{}', so the
-            # deserializer 'as_config' will return a dict and not an empty Config
-            # instance.
-            return c if not isinstance(c, dict) else Config(user=User(), remotes=dict())
+        c = cls.from_json(path.read_bytes())
+        # An empty config is serialized as an empty JSON object '{}', so the
+        # deserializer 'as_config' will return a dict and not an empty Config
+        # instance.
+        return c if not isinstance(c, dict) else Config(user=User(), remotes=dict())
 
     def write(self, path: Path) -> None:
         logger.debug(f"Writing config to file: {path}")
-        path.write_text(self.to_json())
+        # Write to a temporary file first, so that the config is not lost if the
+        # write is interrupted
+        path_tmp = path.with_name(path.name + ".tmp")
+        path_tmp.write_bytes(self.to_json().encode())
+        path_tmp.replace(path)
 
     @classmethod
-    def from_json(cls, json_str) -> Self:
-        return loads(json_str, object_hook=as_config)
+    def from_json(cls, json_str: str | bytes) -> Self:
+        # Parsed with `orjson` if it is installed, which has no object_hook, but
+        # 'as_config' converts the nested members itself
+        return as_config(loads(json_str))
 
     def to_json(self) -> str:
-        return dumps(self, cls=config_encoder, indent=JSON_INDENT)
+        return dumps(dataclass_to_dict(self), indent=JSON_INDENT)
 
     def update(self, other: Self):
         """Updates the values of self with the values from another Config instance."""
@@ -1,13 +1,24 @@
+from copy import copy, deepcopy
 from dataclasses import dataclass
 from enum import Enum, auto
+from functools import cached_property
 from hashlib import file_digest
 from json import dumps, load
 from logging import getLogger
 from pathlib import Path
+from struct import Struct
+from sys import intern
 from typing import NewType, Self
 
-from osgeo.gdal import UseExceptions as gdalUseExceptions
-from osgeo.ogr import UseExceptions as ogrUseExceptions
+from osgeo.gdal import OpenEx as gdalOpenEx, UseExceptions as gdalUseExceptions
+from osgeo.ogr import (
+    CreateGeometryFromWkb,
+    CreateGeometryFromWkt,
+    Open as ogrOpen,
+    UseExceptions as ogrUseExceptions,
+    wkbPolygon,
+)
+from osgeo.osr import CreateCoordinateTransformation, SpatialReference
 
 from geodepot import GEODEPOT_INDEX_EPSG
 from geodepot.config import User
@@ -17,6 +28,12 @@ logger = getLogger(__name__)
 gdalUseExceptions()
 ogrUseExceptions()
 
+# Byte order, geometry type, number of rings, number of points, coordinates
+_WKB_POLYGON_5 = Struct("<BIII10d")
+# Max X, Min X, Max Y, Min Y in the header of a LAS file (any version)
+_LAS_HEADER_EXTENT = Struct("<4d")
+_LAS_HEADER_EXTENT_OFFSET = 179
+
 pdal_filter_stats = {"type": "filters.stats", "dimensions": "X,Y"}
 
 DataName = NewType("DataName", str)
@@ -32,9 +49,13 @@ class Drivers(Enum):
         return self.name
 
 
-@dataclass(repr=True)
+@dataclass(repr=True, frozen=True)
 class BBox:
-    """Bounding box"""
+    """Bounding box
+
+    The bounding box is immutable, so that its geometry representations can be
+    computed once and reused.
+    """
 
     minx: float
     miny: float
@@ -44,27 +65,47 @@ class BBox:
     def __str__(self):
         return f"[{self.minx}, {self.miny}, {self.maxx}, {self.maxy}]"
 
+    @cached_property
+    def _wkb(self) -> bytes:
+        # Little-endian WKB of a polygon with a single, closed ring of five points
+        return _WKB_POLYGON_5.pack(
+            1,
+            wkbPolygon,
+            1,
+            5,
+            self.minx,
+            self.miny,
+            self.maxx,
+            self.miny,
+            self.maxx,
+            self.maxy,
+            self.minx,
+            self.maxy,
+            self.minx,
+            self.miny,
+        )
+
+    @cached_property
+    def _wkt(self) -> str:
+        return self.to_ogr_geometry_wkbpolygon().ExportToWkt()
+
     def to_ogr_geometry_wkbpolygon(self):
-        """Convert to an OGR Geometry that is a wkbPolygon."""
-        from osgeo.ogr import Geometry, wkbPolygon, wkbLinearRing
-
-        ring = Geometry(wkbLinearRing)
-        ring.AddPoint_2D(self.minx, self.miny)
-        ring.AddPoint_2D(self.maxx, self.miny)
-        ring.AddPoint_2D(self.maxx, self.maxy)
-        ring.AddPoint_2D(self.minx, self.maxy)
-        ring.AddPoint_2D(self.minx, self.miny)
-        poly = Geometry(wkbPolygon)
-        poly.AddGeometry(ring)
-        return poly
+        """Convert to an OGR Geometry that is a wkbPolygon.
+
+        Returns a new Geometry on each call, so the caller can take ownership of it.
+        """
+        return CreateGeometryFromWkb(self._wkb)
 
     def to_wkt(self) -> str:
         """Convert to a WKT Polygon."""
-        poly = self.to_ogr_geometry_wkbpolygon()
-        return poly.ExportToWkt()
+        return self._wkt
+
+    def __deepcopy__(self, memo) -> Self:
+        # Immutable, so it can be shared like a tuple
+        return self
 
 
-@dataclass(repr=True)
+@dataclass(repr=True, slots=True)
 class BBoxSRS:
     """Bounding box in EPSG:3857, original SRS and SRS information"""
 
@@ -72,10 +113,19 @@ class BBoxSRS:
     bbox_original_srs: BBox | None = None
     srs_wkt: str | None = None
 
+    def __deepcopy__(self, memo) -> Self:
+        # The members are immutable, so only the container needs to be copied
+        return copy(self)
 
-@dataclass(repr=True, init=False, order=True)
+
+@dataclass(repr=True, init=False)
 class Data:
-    """A data item in the repository."""
+    """A data item in the repository.
+
+    If `las_header_extent` is set, the extent of a LAS/LAZ file is taken from its
+    header instead of computing it from the points. This is much faster, but the
+    header extent can be stale or padded, eg. after the file was edited.
+    """
 
     name: DataName | None = None
     license: str | None = None
@@ -94,6 +144,7 @@ class Data:
         description: str = None,
         changed_by: User = None,
         data_name: str | DataName = None,
+        las_header_extent: bool = False,
     ):
         self.name = (
             DataName(data_name) if data_name is not None else DataName(path.name)
@@ -114,7 +165,7 @@ class Data:
                         f"Could not determine the driver for the format {self.format} of {path}"
                     )
                 else:
-                    self.bbox = self._compute_bbox(path)
+                    self.bbox = self._compute_bbox(path, las_header_extent)
             else:
                 logger.info(
                     f"Forcing format {data_format} on {path}, won't be able to determine driver and compute the bounding box."
@@ -140,9 +191,7 @@ class Data:
             return Drivers.PDAL, pdal_format
         raise ValueError(f"Cannot determine format of {path}")
 
-    def _compute_bbox(self, path: Path) -> BBoxSRS:
-        from osgeo.osr import SpatialReference, CreateCoordinateTransformation
-
+    def _compute_bbox(self, path: Path, las_header_extent: bool = False) -> BBoxSRS:
         target_epsg = GEODEPOT_INDEX_EPSG
         pseudo_mercator = SpatialReference()
         pseudo_mercator.ImportFromEPSG(target_epsg)
@@ -198,8 +247,6 @@ class Data:
                         f"Cannot compute bounding box for {path}, file does not contain a 'vertices' member"
                     )
         elif self.driver == Drivers.GDAL:
-            from osgeo.gdal import OpenEx as gdalOpenEx
-
             with gdalOpenEx(path) as gdal_dataset:
                 bbox_srs = BBoxSRS()
                 srs = gdal_dataset.GetSpatialRef()
@@ -238,8 +285,6 @@ class Data:
                     )
                 return bbox_srs
         elif self.driver == Drivers.OGR:
-            from osgeo.ogr import Open as ogrOpen
-
             with ogrOpen(path) as ogr_dataset:
                 lyr = ogr_dataset.GetLayer(0)
                 srs = lyr.GetSpatialRef()
@@ -268,15 +313,32 @@ class Data:
         elif self.driver == Drivers.PDAL:
             from pdal import Pipeline
 
-            pdal_pipeline = Pipeline(dumps([str(path), pdal_filter_stats]))
-            pdal_pipeline.execute()
-            stats = pdal_pipeline.metadata["metadata"]["filters.stats"]["statistic"]
-            bbox = (
-                stats[0]["minimum"],
-                stats[1]["minimum"],
-                stats[0]["maximum"],
-                stats[1]["maximum"],
-            )
+            if (
+                las_header_extent
+                and (header_bbox := bbox_from_las_header(path)) is not None
+            ):
+                # The extent is in the LAS header, so we only need PDAL for the SRS,
+                # without reading any points
+                pdal_pipeline = Pipeline(
+                    dumps([{"type": "readers.las", "filename": str(path), "count": 0}])
+                )
+                pdal_pipeline.execute()
+                bbox = (
+                    header_bbox.minx,
+                    header_bbox.miny,
+                    header_bbox.maxx,
+                    header_bbox.maxy,
+                )
+            else:
+                pdal_pipeline = Pipeline(dumps([str(path), pdal_filter_stats]))
+                pdal_pipeline.execute()
+                stats = pdal_pipeline.metadata["metadata"]["filters.stats"]["statistic"]
+                bbox = (
+                    stats[0]["minimum"],
+                    stats[1]["minimum"],
+                    stats[0]["maximum"],
+                    stats[1]["maximum"],
+                )
             bbox_srs = BBoxSRS(bbox_original_srs=BBox(*bbox))
             srs_wkt = pdal_pipeline.srswkt2
             if srs_wkt is not None and srs_wkt != "":
@@ -299,43 +361,79 @@ class Data:
             raise ValueError(f"Unknown driver: {self.driver}")
 
     @classmethod
-    def from_ogr_feature(cls, feature) -> Self:
-        from osgeo.ogr import CreateGeometryFromWkt
-
-        df = cls.__new__(cls)
-        df.name = DataName(feature["data_name"])
-        df.sha1 = feature["data_sha1"]
-        df.description = feature["data_description"]
-        df.format = feature["data_format"]
-        df.driver = feature["data_driver"]
-        if feature["data_changed_by"] is None:
-            df.changed_by = None
-        else:
-            df.changed_by = User.from_pretty(feature["data_changed_by"])
-        df.license = feature["data_license"]
+    def from_ogr_feature(
+        cls, feature, field_index: dict[str, int] | None = None
+    ) -> Self:
+        """Create a Data from an OGR feature of the index.
+
+        :param field_index: The index of each field in the layer definition, so that
+            the fields do not need to be looked up by name for each feature.
+        """
         if (gref := feature.GetGeometryRef()) is not None:
             extent = gref.GetEnvelope()
             bbox = BBox(extent[0], extent[2], extent[1], extent[3])
         else:
             bbox = None
-        if feature["data_extent_original_srs"] is not None:
-            extent_original = CreateGeometryFromWkt(
-                feature["data_extent_original_srs"]
-            ).GetEnvelope()
+        if field_index is None:
+            get_field = feature.GetField
+        else:
+            get_field_by_index = feature.GetField
+
+            def get_field(name: str):
+                return get_field_by_index(field_index[name])
+
+        return cls._from_index_fields(get_field, bbox)
+
+    @classmethod
+    def from_geojson_feature(cls, feature: dict) -> Self:
+        """Create a Data from a feature of the index that was parsed with `json`.
+
+        The bbox is computed from the polygon coordinates, without OGR.
+        """
+        if (geometry := feature.get("geometry")) is not None:
+            bbox = bbox_from_coordinates(geometry["coordinates"][0])
+        else:
+            bbox = None
+        return cls._from_index_fields(feature["properties"].get, bbox)
+
+    @classmethod
+    def _from_index_fields(cls, get_field, bbox: BBox | None) -> Self:
+        """Create a Data from the values of the index fields.
+
+        :param get_field: Returns the value of an index field by its name.
+        :param bbox: The bbox in EPSG:3857.
+        """
+        # The format, driver, license and srs repeat across the data items, so
+        # they are interned to keep a single copy of each value
+        df = cls.__new__(cls)
+        df.name = DataName(get_field("data_name"))
+        df.sha1 = get_field("data_sha1")
+        df.description = get_field("data_description")
+        df.format = _intern(get_field("data_format"))
+        df.driver = _intern(get_field("data_driver"))
+        if (changed_by := get_field("data_changed_by")) is None:
+            df.changed_by = None
+        else:
+            df.changed_by = User.from_pretty(changed_by)
+        df.license = _intern(get_field("data_license"))
+        if (extent_original_wkt := get_field("data_extent_original_srs")) is not None:
             df.bbox = BBoxSRS(
                 bbox_epsg_3857=bbox,
-                bbox_original_srs=BBox(
-                    extent_original[0],
-                    extent_original[2],
-                    extent_original[1],
-                    extent_original[3],
-                ),
-                srs_wkt=feature["data_srs"],
+                bbox_original_srs=bbox_from_wkt(extent_original_wkt),
+                srs_wkt=_intern(get_field("data_srs")),
             )
         else:
             df.bbox = None
         return df
 
+    def __deepcopy__(self, memo) -> Self:
+        # Only the changed_by and the bbox are mutable, the other members are str
+        # or enums, which can be shared
+        df = copy(self)
+        df.changed_by = deepcopy(self.changed_by, memo)
+        df.bbox = deepcopy(self.bbox, memo)
+        return df
+
     def to_pretty(self) -> str:
         bbox_wkt = None
         srs_wkt = None
@@ -357,6 +455,53 @@ class Data:
         return "\n".join(output)
 
 
+def bbox_from_coordinates(coordinates: list[list[float]]) -> BBox:
+    """Compute the bbox of a list of coordinates, eg. the ring of a polygon."""
+    xs = [c[0] for c in coordinates]
+    ys = [c[1] for c in coordinates]
+    return BBox(float(min(xs)), float(min(ys)), float(max(xs)), float(max(ys)))
+
+
+def bbox_from_las_header(path: Path) -> BBox | None:
+    """Read the 2D extent from the header of a LAS/LAZ file.
+
+    The header is not compressed in LAZ files either. Returns None if 'path' is not
+    a LAS/LAZ file, or if the extent in the header is not valid.
+    """
+    if path.suffix.lower() not in (".las", ".laz"):
+        return None
+    with path.open("rb") as f:
+        header = f.read(_LAS_HEADER_EXTENT_OFFSET + _LAS_HEADER_EXTENT.size)
+    if len(header) < _LAS_HEADER_EXTENT_OFFSET + _LAS_HEADER_EXTENT.size or (
+        header[:4] != b"LASF"
+    ):
+        return None
+    maxx, minx, maxy, miny = _LAS_HEADER_EXTENT.unpack_from(
+        header, _LAS_HEADER_EXTENT_OFFSET
+    )
+    if not (minx <= maxx and miny <= maxy):
+        return None
+    return BBox(minx, miny, maxx, maxy)
+
+
+def bbox_from_wkt(wkt: str) -> BBox:
+    """Compute the bbox of a WKT geometry.
+
+    A polygon, as it is written by `BBox.to_wkt`, is parsed without OGR.
+    """
+    if wkt.startswith("POLYGON ((") and wkt.endswith("))"):
+        try:
+            coordinates = [
+                [float(v) for v in point.split()]
+                for point in wkt[10:-2].replace("),(", ",").split(",")
+            ]
+            return bbox_from_coordinates(coordinates)
+        except ValueError:
+            pass
+    extent = CreateGeometryFromWkt(wkt).GetEnvelope()
+    return BBox(extent[0], extent[2], extent[1], extent[3])
+
+
 def try_pdal(path: Path) -> str | None:
     from pdal import Reader
 
@@ -371,8 +516,6 @@ def try_pdal(path: Path) -> str | None:
 
 
 def try_ogr(path: Path) -> str | None:
-    from osgeo.ogr import Open as ogrOpen
-
     try:
         with ogrOpen(path) as ogr_dataset:
             return ogr_dataset.GetDriver().GetName()
@@ -381,8 +524,6 @@ def try_ogr(path: Path) -> str | None:
 
 
 def try_gdal(path: Path) -> str | None:
-    from osgeo.gdal import OpenEx as gdalOpenEx
-
     try:
         with gdalOpenEx(path) as gdal_dataset:
             lname = gdal_dataset.GetDriver().LongName
@@ -407,3 +548,7 @@ def is_cityjson_seq(suffixes: list[str]) -> bool:
         return a or b
     else:
         raise ValueError("suffixes must be list")
+
+
+def _intern(value: str | None) -> str | None:
+    return intern(value) if value is not None else None
@@ -12,6 +12,15 @@ class DataClassEncoder(JSONEncoder):
 
     def default(self, o):
         if is_dataclass(o):
-            return {k: v for k, v in asdict(o).items() if v is not None}
+            return dataclass_to_dict(o)
         else:
             return super().default(0)
+
+
+def dataclass_to_dict(o) -> dict:
+    """Convert a dataclass to a dict like DataClassEncoder, omitting unset members.
+
+    Serializing the dict with a plain `json.dumps` avoids calling back into the
+    encoder for every object.
+    """
+    return {k: v for k, v in asdict(o).items() if v is not None}
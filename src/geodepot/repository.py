@@ -1,14 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field, fields
-from enum import Enum, auto
-from itertools import groupby
-from logging import getLogger
+from enum import IntEnum, auto
+from functools import cache, cached_property
+from gzip import GzipFile
+from logging import DEBUG, getLogger
+from operator import attrgetter
+from os import fspath, fstat, link, rmdir, scandir, unlink, walk
 from pathlib import Path
-from shutil import copy2, copytree, rmtree
-from tarfile import TarFile
+from shlex import quote
+from socket import IPPROTO_TCP, TCP_NODELAY, socket
+from sys import intern
+from shutil import copy2, copyfileobj, copystat, copytree
+from tarfile import TarError, TarFile, open as tar_open
+from threading import Lock, local as thread_local
 from typing import Self, Any
 from urllib.parse import urlparse
 
-from osgeo.ogr import UseExceptions
+try:
+    # orjson parses large indexes considerably faster, but it is optional
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+try:
+    from fcntl import ioctl
+    from os import copy_file_range
+except ImportError:
+    # Only available on Linux
+    copy_file_range = None
+
+from osgeo.ogr import (
+    GetDriverByName,
+    FieldDefn,
+    OFTString,
+    OFTInteger64,
+    wkbPolygon,
+    Feature,
+    NullFID,
+    OGRERR_NONE,
+    OLCTransactions,
+    UseExceptions,
+)
+from osgeo.osr import SpatialReference
 
 from geodepot import (
     ARCHIVE_EXTENSION,
@@ -26,7 +60,7 @@ from geodepot.config import (
     Remote,
     RemoteName,
 )
-from geodepot.data import Data
+from geodepot.data import BBoxSRS, Data
 from geodepot.errors import (
     GeodepotRuntimeError,
     GeodepotInvalidRepository,
@@ -36,15 +70,37 @@ from geodepot.errors import (
 UseExceptions()
 logger = getLogger(__name__)
 
+# The ioctl request for cloning a file on Linux (FICLONE from linux/fs.h)
+FICLONE = 0x40049409
+# The number of concurrent transfers to and from a remote
+TRANSFER_WORKERS = 8
+# The number of concurrent copies of the data files into the repository
+COPY_WORKERS = 8
+# The SSH channel window and maximum packet size of the connections to a remote
+SSH_WINDOW_SIZE = 64 * 1024 * 1024
+SSH_MAX_PACKET_SIZE = 256 * 1024
+# The maximum number of paths that are passed to a single command on a remote
+SSH_ARGS_PER_COMMAND = 100
+# The block size for reading and streaming tar archives
+TAR_BUFSIZE = 1 << 20
+# Number of features that are written to the index in a single transaction
+INDEX_TRANSACTION_SIZE = 10_000
+# The Data members that are compared in Index.diff
+_DATA_DIFF_FIELDS: tuple[str, ...] = tuple(
+    f.name for f in fields(Data) if f.name not in ("name", "changed_by")
+)
+# Get the values of all compared members at once, to find the identical Data quickly
+_get_data_diff_values = attrgetter(*_DATA_DIFF_FIELDS)
+
 
-class Status(Enum):
+class Status(IntEnum):
     ADD_OR_DELETE = auto()
     ADD = auto()
     DELETE = auto()
     MODIFY = auto()
 
 
-@dataclass(repr=True, order=True)
+@dataclass(repr=True, slots=True)
 class IndexDiff:
     status: Status
     changed_by_other: User | None = None
@@ -63,61 +119,77 @@ def create_modified_diff(
         casespec_other=casespec,
         status=Status.MODIFY,
         changed_by_other=df_other.changed_by,
-        value_self=df_self.__getattribute__(member),
-        value_other=df_other.__getattribute__(member),
+        value_self=getattr(df_self, member),
+        value_other=getattr(df_other, member),
         member=member,
     )
 
 
+def diff_bbox(
+    bbox_self: BBoxSRS | None, bbox_other: BBoxSRS | None
+) -> tuple[str, Any, Any]:
+    """Find the member that differs between two BBoxSRS.
+
+    Return the name of the member and its values in 'self' and 'other'.
+    """
+    if bbox_self is None or bbox_other is None:
+        return "bbox", bbox_self, bbox_other
+    for member_name, attr in (
+        ("srs", "srs_wkt"),
+        ("bbox_original_srs", "bbox_original_srs"),
+        ("bbox_epsg_3857", "bbox_epsg_3857"),
+    ):
+        value_self = getattr(bbox_self, attr)
+        value_other = getattr(bbox_other, attr)
+        if value_self != value_other:
+            return member_name, value_self, value_other
+    return "bbox", bbox_self, bbox_other
+
+
 def format_indexdiffs(diff_all: list[IndexDiff], push: bool = True) -> str:
     sign_local = "+" if push else "-"
     sign_remote = "-" if push else "+"
 
-    def l_casespec(cs):
-        return cs.casespec_self, cs.casespec_other, cs.status
-
-    diff_all_sorted = sorted(diff_all, key=l_casespec)
-    all_changes = []
+    # Group the diffs on the case/data and status in a single pass
+    groups: dict[tuple, list[IndexDiff]] = {}
+    for indexdiff in diff_all:
+        groups.setdefault(
+            (indexdiff.casespec_self, indexdiff.casespec_other, indexdiff.status), []
+        ).append(indexdiff)
     currentuser = get_current_user()
-    for k, g in groupby(diff_all_sorted, key=l_casespec):
-        changes = []
-        # Add the case/data header
-        indexdiff = next(g)
-
-        changes.append(
-            f"{sign_local * 3} local/{indexdiff.casespec_self}    ({currentuser.to_pretty() if currentuser else None})\n{sign_remote * 3} remote/{indexdiff.casespec_other}    ({indexdiff.changed_by_other.to_pretty() if indexdiff.changed_by_other else None})"
-        )
-        if indexdiff.status == Status.MODIFY:
-            changes.append(
-                f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}"
-            )
-        # Report the modified values
-        for indexdiff in g:
+    currentuser_pretty = currentuser.to_pretty() if currentuser else None
+
+    def changes():
+        """Yield the blocks of the output, which are separated by an empty line."""
+        for g in groups.values():
+            # Add the case/data header
+            indexdiff = g[0]
+            yield f"{sign_local * 3} local/{indexdiff.casespec_self}    ({currentuser_pretty})\n{sign_remote * 3} remote/{indexdiff.casespec_other}    ({indexdiff.changed_by_other.to_pretty() if indexdiff.changed_by_other else None})"
             if indexdiff.status == Status.MODIFY:
-                if indexdiff.member.startswith("bbox"):
-                    wkt_self = (
-                        None
-                        if indexdiff.value_self is None
-                        else indexdiff.value_self.to_wkt()
-                    )
-                    wkt_other = (
-                        None
-                        if indexdiff.value_other is None
-                        else indexdiff.value_other.to_wkt()
-                    )
-                    changes.append(
-                        f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}\n{sign_local}{indexdiff.member} (WKT)={wkt_self}\n{sign_remote}{indexdiff.member} (WKT)={wkt_other}"
-                    )
-                else:
-                    changes.append(
-                        f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}"
-                    )
-        all_changes.append("\n\n".join(changes))
-    return "\n\n".join(all_changes)
+                yield f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}"
+            # Report the modified values
+            for indexdiff in g[1:]:
+                if indexdiff.status == Status.MODIFY:
+                    if indexdiff.member in ("bbox_original_srs", "bbox_epsg_3857"):
+                        wkt_self = (
+                            None
+                            if indexdiff.value_self is None
+                            else indexdiff.value_self.to_wkt()
+                        )
+                        wkt_other = (
+                            None
+                            if indexdiff.value_other is None
+                            else indexdiff.value_other.to_wkt()
+                        )
+                        yield f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}\n{sign_local}{indexdiff.member} (WKT)={wkt_self}\n{sign_remote}{indexdiff.member} (WKT)={wkt_other}"
+                    else:
+                        yield f"{sign_local}{indexdiff.member}={indexdiff.value_self}\n{sign_remote}{indexdiff.member}={indexdiff.value_other}"
+
+    return "\n\n".join(changes())
 
 
 # to update index: https://pcjericks.github.io/py-gdalogr-cookbook/vector_layers.html#load-data-to-memory
-@dataclass(repr=True, order=True)
+@dataclass(repr=True, slots=True)
 class Index:
     cases: dict[CaseName, Case] = field(default_factory=dict)
 
@@ -128,92 +200,95 @@ class Index:
         return self.cases.pop(case_name, None)
 
     def write(self, path: Path):
-        from osgeo.ogr import (
-            GetDriverByName,
-            FieldDefn,
-            FeatureDefn,
-            OFTString,
-            OFTInteger64,
-            wkbPolygon,
-            Feature,
-            OGRERR_NONE,
-        )
-        from osgeo.osr import SpatialReference
-
+        # We simple write a new index on serialization. It is written to a temporary
+        # file first (with the same extension, for the driver), which replaces the
+        # index when it is complete, so a failed write does not lose the index.
+        path_tmp = path.with_stem(path.stem + ".tmp")
         try:
-            INDEX_SRS = SpatialReference()
-            INDEX_SRS.ImportFromEPSG(GEODEPOT_INDEX_EPSG)
-            INDEX_FIELD_DEFINITIONS = (
-                FieldDefn("fid", OFTInteger64),
-                FieldDefn("case_name", OFTString),
-                FieldDefn("case_sha1", OFTString),
-                FieldDefn("case_description", OFTString),
-                FieldDefn("data_name", OFTString),
-                FieldDefn("data_sha1", OFTString),
-                FieldDefn("data_description", OFTString),
-                FieldDefn("data_format", OFTString),
-                FieldDefn("data_driver", OFTString),
-                FieldDefn("data_changed_by", OFTString),
-                FieldDefn("data_license", OFTString),
-                FieldDefn("data_srs", OFTString),
-                FieldDefn("data_extent_original_srs", OFTString),
-            )
+            index_srs, index_field_definitions = _index_definitions()
             fid = 0
-            # We simple write a new index on serialization
-            if path.exists():
-                path.exists()
-            with GetDriverByName("GeoJSON").CreateDataSource(path) as ds:
+            path_tmp.unlink(missing_ok=True)
+            with GetDriverByName("GeoJSON").CreateDataSource(path_tmp) as ds:
                 # Layer definition
                 lyr = ds.CreateLayer(
                     "index",
-                    srs=INDEX_SRS,
+                    srs=index_srs,
                     geom_type=wkbPolygon,
+                    # The layer name is not needed in the index
+                    options=["WRITE_NAME=NO"],
                 )
-                lyr.CreateFields(INDEX_FIELD_DEFINITIONS)
-                # Feature definition
-                defn = FeatureDefn()
-                for fdef in INDEX_FIELD_DEFINITIONS:
-                    defn.AddFieldDefn(fdef)
-
+                lyr.CreateFields(index_field_definitions)
+                defn = lyr.GetLayerDefn()
+
+                # Let the driver batch the writes if it supports transactions
+                use_transaction = lyr.TestCapability(OLCTransactions)
+                if use_transaction:
+                    lyr.StartTransaction()
+                # A single feature is reused for all data items, so all of its
+                # fields and its geometry are overwritten for each item
+                feat = Feature(defn)
                 for case_name, case in self.cases.items():
                     for data in case.data.values():
-                        feat = Feature(defn)
-                        feat["fid"] = fid
-                        feat["case_name"] = case_name
-                        feat["case_sha1"] = case.sha1
-                        feat["case_description"] = case.description
-                        feat["data_name"] = data.name
-                        feat["data_sha1"] = data.sha1
-                        feat["data_description"] = data.description
-                        feat["data_format"] = data.format
-                        feat["data_driver"] = data.driver
-                        feat["data_changed_by"] = (
+                        srs_wkt = None
+                        extent_original_srs = None
+                        geometry = None
+                        if (bbox := data.bbox) is not None:
+                            srs_wkt = bbox.srs_wkt
+                            if bbox.bbox_original_srs is not None:
+                                extent_original_srs = bbox.bbox_original_srs.to_wkt()
+                            if bbox.bbox_epsg_3857 is not None:
+                                geometry = (
+                                    bbox.bbox_epsg_3857.to_ogr_geometry_wkbpolygon()
+                                )
+                        # In the order of the index field definitions
+                        values = (
+                            fid,
+                            case_name,
+                            case.sha1,
+                            case.description,
+                            data.name,
+                            data.sha1,
+                            data.description,
+                            data.format,
+                            str(data.driver) if data.driver is not None else None,
                             data.changed_by.to_pretty()
                             if data.changed_by is not None
-                            else None
+                            else None,
+                            data.license,
+                            srs_wkt,
+                            extent_original_srs,
                         )
-                        feat["data_license"] = data.license
-                        if data.bbox is not None:
-                            feat["data_srs"] = data.bbox.srs_wkt
-                            if data.bbox.bbox_original_srs is not None:
-                                feat["data_extent_original_srs"] = (
-                                    data.bbox.bbox_original_srs.to_wkt()
-                                )
-                            if data.bbox.bbox_epsg_3857 is not None:
-                                feat.SetGeometry(
-                                    data.bbox.bbox_epsg_3857.to_ogr_geometry_wkbpolygon()
-                                )
+                        feat.SetFID(NullFID)
+                        for i, value in enumerate(values):
+                            if value is None:
+                                # Write null instead of leaving the field unset,
+                                # otherwise the field is missing from the index
+                                # if it is not set on any of the features
+                                feat.SetFieldNull(i)
+                            else:
+                                feat.SetField(i, value)
+                        if geometry is None:
+                            feat.SetGeometry(None)
                         else:
-                            feat["data_srs"] = None
-                            feat["data_extent_original_srs"] = None
+                            # The feature takes ownership of the geometry,
+                            # instead of copying it
+                            feat.SetGeometryDirectly(geometry)
                         if lyr.CreateFeature(feat) != OGRERR_NONE:
                             logger.error(
                                 f"Failed to create OGR Feature on the layer from {data}"
                             )
                         fid += 1
+                        if use_transaction and fid % INDEX_TRANSACTION_SIZE == 0:
+                            # Keep the transactions bounded on large indices
+                            lyr.CommitTransaction()
+                            lyr.StartTransaction()
+                if use_transaction:
+                    lyr.CommitTransaction()
+            path_tmp.replace(path)
         except Exception as e:
+            path_tmp.unlink(missing_ok=True)
             logger.critical(
-                f"Failed to serialize index with exception '{e}', repository is probably in an invalid state."
+                f"Failed to serialize index with exception '{e}', the index {path} is not updated."
             )
 
     @classmethod
@@ -223,30 +298,60 @@ class Index:
             if not path.exists():
                 logger.critical(f"Index path {path} does not exist")
                 return None
-        from osgeo.ogr import GetDriverByName
-
         cases_in_index = {}
         try:
-            with GetDriverByName("GeoJSON").Open(path) as ds:
-                lyr = ds.GetLayer()
-                for feat in lyr:
-                    case_name = CaseName(feat["case_name"])
-                    case = cases_in_index.get(
-                        case_name,
-                        Case(
-                            name=CaseName(feat["case_name"]),
-                            sha1=feat["case_sha1"],
-                            description=feat["case_description"],
-                        ),
+            for case_name, case_sha1, case_description, df in cls._read_features(path):
+                if (case := cases_in_index.get(case_name)) is None:
+                    case = cases_in_index[case_name] = Case(
+                        name=CaseName(case_name),
+                        sha1=case_sha1,
+                        description=case_description,
                     )
-                    df = Data.from_ogr_feature(feat)
-                    case.add_data(df)
-                    cases_in_index[case_name] = case
+                case.add_data(df)
         except Exception as e:
             logger.critical(f"Failed to deserialize index with exception '{e}'")
             return None
         return Index(cases=cases_in_index)
 
+    @staticmethod
+    def _read_features(path: Path | str):
+        """Read the features of the index.
+
+        Yields the case name, case sha1, case description and the Data of each feature.
+        A local index is parsed as plain JSON (with `orjson` if it is installed),
+        because we only need the attributes and the bounding boxes, which are cheaper
+        to compute without OGR. A remote index (URL) is read with the OGR GeoJSON
+        driver.
+        """
+        if isinstance(path, Path):
+            for feat in loads(path.read_bytes())["features"]:
+                properties = feat["properties"]
+                yield (
+                    intern(properties["case_name"]),
+                    properties.get("case_sha1"),
+                    properties.get("case_description"),
+                    Data.from_geojson_feature(feat),
+                )
+        else:
+            with GetDriverByName("GeoJSON").Open(str(path)) as ds:
+                lyr = ds.GetLayer()
+                # Resolve the field indices once, instead of by name for each feature
+                defn = lyr.GetLayerDefn()
+                field_index = {
+                    defn.GetFieldDefn(i).GetName(): i
+                    for i in range(defn.GetFieldCount())
+                }
+                i_case_name = field_index["case_name"]
+                i_case_sha1 = field_index["case_sha1"]
+                i_case_description = field_index["case_description"]
+                for feat in lyr:
+                    yield (
+                        intern(feat.GetField(i_case_name)),
+                        feat.GetField(i_case_sha1),
+                        feat.GetField(i_case_description),
+                        Data.from_ogr_feature(feat, field_index),
+                    )
+
     def diff(self, other: Self) -> list[IndexDiff]:
         """Compare the 'other' index to 'self'.
         The difference is not symmetrical, and additions and deletions are determined
@@ -254,6 +359,7 @@ class Index:
         The IndexDiff.status answers the question, "What operation does the 'other' do to 'self'?".
         """
         diff_all = []
+        append = diff_all.append
         if len(self.cases) == 0 and len(other.cases) == 0:
             return diff_all
         # Compare the cases that exist in both
@@ -263,45 +369,35 @@ class Index:
                     casespec = CaseSpec(case_name=case_name, data_name=data_name)
                     data_other = case_other.data.get(data_name, None)
                     if data_other is not None:
-                        for member in fields(Data):
-                            if member.name not in ("name", "changed_by"):
-                                member_name = member.name
-                                value_self = getattr(data_self, member.name)
-                                value_other = getattr(data_other, member.name)
-                                if value_self != value_other:
-                                    # Nasty piece this complex BBoxSRS type...
-                                    if member.name == "bbox":
-                                        if value_self.srs_wkt != value_other.srs_wkt:
-                                            member_name = "srs"
-                                            value_self = value_self.srs_wkt
-                                            value_other = value_other.srs_wkt
-                                        elif (
-                                            value_self.bbox_original_srs
-                                            != value_other.bbox_original_srs
-                                        ):
-                                            member_name = "bbox_original_srs"
-                                            value_self = value_self.bbox_original_srs
-                                            value_other = value_other.bbox_original_srs
-                                        elif (
-                                            value_self.bbox_epsg_3857
-                                            != value_other.bbox_epsg_3857
-                                        ):
-                                            member_name = "bbox_epsg_3857"
-                                            value_self = value_self.bbox_epsg_3857
-                                            value_other = value_other.bbox_epsg_3857
-                                    diff_all.append(
-                                        IndexDiff(
-                                            casespec_self=casespec,
-                                            casespec_other=casespec,
-                                            status=Status.MODIFY,
-                                            changed_by_other=data_other.changed_by,
-                                            value_self=value_self,
-                                            value_other=value_other,
-                                            member=member_name,
-                                        )
+                        # Most data is unchanged, so only compare the members
+                        # one-by-one if any of them differ
+                        if _get_data_diff_values(data_self) == _get_data_diff_values(
+                            data_other
+                        ):
+                            continue
+                        for member in _DATA_DIFF_FIELDS:
+                            member_name = member
+                            value_self = getattr(data_self, member)
+                            value_other = getattr(data_other, member)
+                            if value_self != value_other:
+                                # Nasty piece this complex BBoxSRS type...
+                                if member == "bbox":
+                                    member_name, value_self, value_other = diff_bbox(
+                                        value_self, value_other
+                                    )
+                                append(
+                                    IndexDiff(
+                                        casespec_self=casespec,
+                                        casespec_other=casespec,
+                                        status=Status.MODIFY,
+                                        changed_by_other=data_other.changed_by,
+                                        value_self=value_self,
+                                        value_other=value_other,
+                                        member=member_name,
                                     )
+                                )
                     else:
-                        diff_all.append(
+                        append(
                             IndexDiff(
                                 casespec_self=casespec,
                                 casespec_other=None,
@@ -309,21 +405,19 @@ class Index:
                                 changed_by_other=case_other.changed_by,
                             )
                         )
-                diff_other_data = set(case_other.data.keys()).difference(
-                    set(case_self.data.keys())
-                )
-                for data_name in diff_other_data:
-                    diff_all.append(
-                        IndexDiff(
-                            casespec_self=None,
-                            casespec_other=CaseSpec(case_name, data_name),
-                            status=Status.ADD,
-                            changed_by_other=case_other.get_data(data_name).changed_by,
-                        )
+                diff_other_data = case_other.data.keys() - case_self.data.keys()
+                diff_all.extend(
+                    IndexDiff(
+                        casespec_self=None,
+                        casespec_other=CaseSpec(case_name, data_name),
+                        status=Status.ADD,
+                        changed_by_other=case_other.data[data_name].changed_by,
                     )
+                    for data_name in diff_other_data
+                )
                 # Check if any of the case attributes have changed
                 if case_self.description != case_other.description:
-                    diff_all.append(
+                    append(
                         IndexDiff(
                             casespec_self=CaseSpec(case_name=case_name),
                             casespec_other=CaseSpec(case_name=case_name),
@@ -336,7 +430,7 @@ class Index:
                     )
             else:
                 # The case doesn't exist in the other index, not much that we can report
-                diff_all.append(
+                append(
                     IndexDiff(
                         casespec_self=CaseSpec(case_name=case_name),
                         casespec_other=None,
@@ -344,17 +438,17 @@ class Index:
                         changed_by_other=None,
                     )
                 )
-        diff_other_cases = set(other.cases.keys()).difference(set(self.cases.keys()))
-        for case_name in diff_other_cases:
-            # The other has a case that self does not
-            diff_all.append(
-                IndexDiff(
-                    casespec_self=None,
-                    casespec_other=CaseSpec(case_name=case_name),
-                    status=Status.ADD,
-                    changed_by_other=other.cases.get(case_name).changed_by,
-                )
+        diff_other_cases = other.cases.keys() - self.cases.keys()
+        # The other has cases that self does not
+        diff_all.extend(
+            IndexDiff(
+                casespec_self=None,
+                casespec_other=CaseSpec(case_name=case_name),
+                status=Status.ADD,
+                changed_by_other=other.cases[case_name].changed_by,
             )
+            for case_name in diff_other_cases
+        )
         return diff_all
 
 
@@ -368,30 +462,131 @@ def is_url(path: str) -> bool:
     )
 
 
+class _ConnectionPool:
+    """An SSH connection to a remote host, which is reused for all transfers.
+
+    There is a single connection per host, so the user authenticates only once, and
+    the connection limits of the server (eg. MaxStartups) are not hit. Concurrent
+    transfers run on separate channels of this connection, see `_ThreadSession`. The
+    connection is opened on first use, reopened if it broke, and stays open until
+    `close` is called.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self._conn = None
+        self._lock = Lock()
+
+    @contextmanager
+    def connection(self):
+        """Use the connection, opening it if needed."""
+        with self._lock:
+            if self._conn is not None and not self._conn.is_connected:
+                self._drop()
+            if self._conn is None:
+                self._conn = self._open()
+            conn = self._conn
+        try:
+            yield conn
+        finally:
+            # Don't reuse a broken connection
+            if not conn.is_connected:
+                with self._lock:
+                    if self._conn is conn:
+                        self._drop()
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def _drop(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _open(self):
+        from fabric import Connection
+
+        conn = Connection(self.host)
+        conn.open()
+        # Don't delay the small SFTP requests. The socket buffers are left to the
+        # kernel, because setting them explicitly disables their auto-tuning. Through
+        # a ProxyJump or ProxyCommand, the transport is not on a socket.
+        transport = conn.client.get_transport()
+        if isinstance(transport.sock, socket):
+            transport.sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        # Paramiko's default 2 MiB channel window limits the throughput of a single
+        # transfer to 2 MiB per round-trip, which is far below the bandwidth of a long
+        # and fat link. The channels (eg. SFTP) that are opened later use these sizes.
+        transport.default_window_size = SSH_WINDOW_SIZE
+        transport.default_max_packet_size = SSH_MAX_PACKET_SIZE
+        return conn
+
+
+class _ThreadSession:
+    """The use of a shared Fabric connection by a single thread.
+
+    The commands run on their own channels of the connection, and the thread has its
+    own SFTP session, because an SFTP session cannot be shared between threads.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.host = conn.host
+        self.client = conn.client
+        self._sftp = None
+
+    def run(self, command: str, **kwargs):
+        return self.conn.run(command, **kwargs)
+
+    def sftp(self):
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def close(self):
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+
+
 @dataclass(repr=True, init=False)
 class Repository:
     path: Path = field(default_factory=lambda: Path.cwd() / ".geodepot")
-    index: Index | None = None
     index_remote: Index | None = None
     config: Config | None = None
+    _index: Index | None = field(default=None, repr=False)
+    _connection_pools: dict[str, _ConnectionPool] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    _batch_depth: int = field(default=0, repr=False, compare=False)
+    _index_dirty: bool = field(default=False, repr=False, compare=False)
 
-    @property
+    @cached_property
     def path_cases(self):
         return self.path / GEODEPOT_CASES
 
-    @property
+    @cached_property
     def path_index(self):
         return self.path / GEODEPOT_INDEX
 
-    @property
+    @cached_property
     def path_config_local(self):
         return self.path / GEODEPOT_CONFIG_LOCAL
 
+    @property
+    def index(self) -> Index:
+        """The local index. It is only deserialized on first access."""
+        if self._index is None:
+            self.load_index()
+        return self._index
+
     @property
     def cases(self):
         return self.index.cases
 
     def __init__(self, path: str | None = None, create: bool = False):
+        self._connection_pools = {}
         if path is None:
             # We are in the current working directory
             path_local = Path.cwd() / ".geodepot"
@@ -411,7 +606,7 @@ class Repository:
                     raise GeodepotRuntimeError(
                         "Geodepot does not support creating remote repositories (cannot set 'path' to a URL and 'create=True')."
                     )
-                from requests import get as requests_get
+                from requests import Session
 
                 path_local = Path.cwd() / ".geodepot"
                 if path_local.is_dir():
@@ -421,15 +616,16 @@ class Repository:
                 else:
                     path_local.joinpath(GEODEPOT_CASES).mkdir(parents=True)
                 url_root = urlparse(path).geturl()
-                # Download existing repository
-                response = requests_get("/".join([url_root, GEODEPOT_INDEX]))
-                response.raise_for_status()
-                path_local.joinpath(GEODEPOT_INDEX).write_bytes(response.content)
-                response = requests_get("/".join([url_root, GEODEPOT_CONFIG_LOCAL]))
-                response.raise_for_status()
+                remote_origin = Remote(name="origin", url=url_root)
+                # Download existing repository, reusing the connection to the host
+                with Session() as session:
+                    with session.get(remote_origin.path_index, stream=True) as response:
+                        response.raise_for_status()
+                        _stream_to_file(response, path_local.joinpath(GEODEPOT_INDEX))
+                    response = session.get("/".join([url_root, GEODEPOT_CONFIG_LOCAL]))
+                    response.raise_for_status()
                 config = Config.from_json(response.content)
                 if "origin" not in config.remotes:
-                    remote_origin = Remote(name="origin", url=url_root)
                     config.remotes["origin"] = remote_origin
                     config.write(path_local.joinpath(GEODEPOT_CONFIG_LOCAL))
                     logger.debug(f"Added {remote_origin} to config.remotes")
@@ -447,6 +643,24 @@ class Repository:
         else:
             raise TypeError("Path must be a string or None")
 
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the connections to the remotes."""
+        for pool in self._connection_pools.values():
+            pool.close()
+        self._connection_pools.clear()
+
+    def _connection_pool(self, host: str) -> _ConnectionPool:
+        """The pool of SSH connections to 'host', which is reused between operations."""
+        if (pool := self._connection_pools.get(host)) is None:
+            pool = self._connection_pools[host] = _ConnectionPool(host)
+        return pool
+
     def add(
         self,
         casespec: str,
@@ -455,9 +669,10 @@ class Repository:
         license: str | None = None,
         format: str | None = None,
         as_data: bool = False,
+        las_header_extent: bool = False,
         yes: bool = True,
     ):
-        self.load_index()
+        # The index is loaded on first access, and kept up to date in memory after
         casespec = CaseSpec.from_str(casespec)
         if not yes:
             raise NotImplementedError
@@ -510,28 +725,59 @@ class Repository:
         else:
             # Add/Update the specified data to the case
             data_paths = parse_pathspec(pathspec, as_data=as_data)
-            for p in data_paths:
-                data = case.add_from_path(
+
+            def read(p: Path) -> Data:
+                # Reading the data for its index entry (sha1, bbox) is independent
+                # of the other data items
+                return Data(
                     p,
-                    casespec=casespec,
                     data_license=license,
                     data_format=format,
-                    data_description=data_description,
-                    data_changed_by=current_user,
+                    description=data_description,
+                    changed_by=current_user,
+                    data_name=casespec.data_name,
+                    las_header_extent=las_header_extent,
                 )
+
+            def store(p: Path):
                 destination = self._copy_data(p, casespec)
                 path_archive = self._compress_data(destination)
                 if path_archive.exists():
                     if destination.is_file():
                         destination.unlink()
                     else:
-                        rmtree(destination)
+                        _fast_rmtree(destination)
                 else:
                     logger.critical(
                         f"Failed to compress {destination} and {path_archive} does not exist"
                     )
+
+            # The paths that are stored under the same name (eg. files with the same
+            # name in different directories, or all paths if a data name is given)
+            # share their destination and archive. So they are stored one after the
+            # other, in their order, and only the groups are stored in parallel.
+            groups: dict[str, list[Path]] = {}
+            for p in data_paths:
+                groups.setdefault(casespec.data_name or p.name, []).append(p)
+
+            def store_group(paths: list[Path]):
+                for p in paths:
+                    store(p)
+
+            with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+                # All the data is read before any of it is stored in the case
+                # directory, so that a path that cannot be read does not leave
+                # archives behind that are not in the index
+                data_items = list(executor.map(read, data_paths))
+                for _ in executor.map(store_group, groups.values()):
+                    pass
+            # The case is only modified from this thread
+            for data in data_items:
+                case.add_data(data)
                 logger.info(f"Added {data.name} to {case.name}")
-                logger.debug(data.to_pretty())
+                # to_pretty formats the bbox as WKT, so skip it if it is not logged
+                if logger.isEnabledFor(DEBUG):
+                    logger.debug(data.to_pretty())
         self.index.add_case(case)
         self.write_index()
         logger.debug(f"Serialized the index to {self.path_index}")
@@ -586,17 +832,19 @@ class Repository:
                         )
                         casespec_archive = str(casespec) + ARCHIVE_EXTENSION
                         url_remote_archive = "/".join(
-                            [remote.url, GEODEPOT_CASES, casespec_archive]
+                            [remote.path_cases, casespec_archive]
                         )
-                        response = requests_get(url_remote_archive)
-                        if response.status_code == 200:
-                            archive.parent.mkdir(exist_ok=True)
-                            archive.write_bytes(response.content)
-                            logger.info(f"Downloaded {casespec} from remote '{remote}'")
-                        elif response.status_code == 404:
-                            pass
-                        else:
-                            response.raise_for_status()
+                        with requests_get(url_remote_archive, stream=True) as response:
+                            if response.status_code == 200:
+                                archive.parent.mkdir(exist_ok=True)
+                                _stream_to_file(response, archive)
+                                logger.info(
+                                    f"Downloaded {casespec} from remote '{remote}'"
+                                )
+                            elif response.status_code == 404:
+                                pass
+                            else:
+                                response.raise_for_status()
                     else:
                         logger.debug(
                             f"Trying to download {casespec} from a remote, but the config does not contain a remote with name {remote_name}."
@@ -617,7 +865,7 @@ class Repository:
         case = Case(name=casespec.case_name, description=None)
         self.index.add_case(case)
         self.path_cases.joinpath(casespec.case_name).mkdir()
-        return self.get_case(casespec)
+        return case
 
     def load_config(self):
         """Load the configuration."""
@@ -629,8 +877,8 @@ class Repository:
         If 'remote' is provided, download and load the index from the remote.
         """
         if remote is None:
-            self.index = Index.load(self.path_index)
-            if self.index is None:
+            self._index = Index.load(self.path_index)
+            if self._index is None:
                 raise GeodepotInvalidRepository(
                     f"Could not load index from {self.path_index}"
                 )
@@ -645,19 +893,30 @@ class Repository:
             # If the URL is ssh, then the remote_index_url is the file path on the remote server
             if remote.is_ssh:
                 # GDAL cannot handle ssh/sftp
-                from fabric import Connection
-
-                ssh_conn = Connection(remote.ssh_host)
                 remote_index_locally = self.path / f"remote_{GEODEPOT_INDEX}"
                 try:
-                    result = ssh_conn.get(
-                        remote=str(remote_index_path), local=str(remote_index_locally)
-                    )
-                    remote_index_url = Path(result.local)
+                    with self._connection_pool(remote.ssh_host).connection() as conn:
+                        _get_index(conn, str(remote_index_path), remote_index_locally)
+                    remote_index_url = remote_index_locally
                 except Exception as e:
                     raise GeodepotInvalidRepository(
                         f"The remote '{remote}' cannot be accessed or does not contain a {GEODEPOT_INDEX} at {remote_index_path}. With:\n{e}"
                     )
+            elif remote_index_path.startswith("http"):
+                # Keep a copy of the remote index, so it is only downloaded again if
+                # it changed, and it can be parsed as a local file
+                remote_index_locally = (
+                    self.path / f"remote_{remote.name}_{GEODEPOT_INDEX}"
+                )
+                from requests import RequestException
+
+                try:
+                    _get_index_http(remote_index_path, remote_index_locally)
+                    remote_index_url = remote_index_locally
+                except (RequestException, OSError) as e:
+                    raise GeodepotInvalidRepository(
+                        f"The remote '{remote}' cannot be accessed or does not contain a {GEODEPOT_INDEX} at {remote_index_path}. With:\n{e}"
+                    )
             else:
                 remote_index_url = remote_index_path
             if remote_index_url is not None:
@@ -679,8 +938,6 @@ class Repository:
                 f"The remote '{remote}' must use an ssh/sftp protocol in order to pull changes."
             )
 
-        from fabric import Connection
-
         # See comments in 'push'. Here we do the opposite, because we overwrite the
         # local with the remote.
         data_to_download = set(
@@ -688,47 +945,62 @@ class Repository:
             for i in diff_all
             if i.status == Status.ADD or i.status == Status.MODIFY
         )
-        data_to_delete = set(
-            i.casespec_self for i in diff_all if i.status == Status.DELETE
+        data_to_delete = _drop_data_of_cases(
+            set(i.casespec_self for i in diff_all if i.status == Status.DELETE)
         )
 
-        conn_ssh = Connection(remote.ssh_host)
+        pool = self._connection_pool(remote.ssh_host)
+        # Bind once, instead of creating the Paths and strings for each item
+        path_cases = self.path_cases
+        path_cases_remote = remote.path_cases
 
-        for data in data_to_download:
-            _ = self.path_cases.joinpath(data.to_path())
-            # data_path_remote = "/".join([remote.path_cases, str(data)])
+        def download(conn: _ThreadSession, data: CaseSpec):
             casespec_archive = str(data) + ARCHIVE_EXTENSION
-            archive_path_remote = "/".join([remote.path_cases, casespec_archive])
-            local_case_archive = self.path_cases / casespec_archive
+            archive_path_remote = f"{path_cases_remote}/{casespec_archive}"
+            local_case_archive = path_cases / casespec_archive
             try:
-                _ = conn_ssh.get(
-                    local=str(local_case_archive), remote=archive_path_remote
-                )
+                conn.sftp().get(archive_path_remote, str(local_case_archive))
             except Exception as e:
                 logger.error(
                     f"Failed to download {data} from remote {remote.name} with:\n{e}"
                 )
-        for data in data_to_delete:
+
+        _map_with_connections(pool, download, data_to_download)
+
+        def delete(data: CaseSpec):
             if data.is_case:
                 try:
-                    rmtree(self.path_cases.joinpath(data.to_path()))
+                    _fast_rmtree(path_cases.joinpath(data.to_path()))
                 except Exception as e:
                     logger.error(f"Failed to delete local {data} with error: {e}")
             else:
                 try:
-                    self.path_cases.joinpath(data.to_path()).unlink()
+                    path_cases.joinpath(data.to_path()).unlink()
                 except Exception as e:
                     logger.error(f"Failed to delete local {data} with error: {e}")
 
+        # The deletions are independent and bound by syscalls, so overlap them
+        with ThreadPoolExecutor() as executor:
+            for _ in executor.map(delete, data_to_delete):
+                pass
+
         try:
             logger.debug(f"GET local={self.path_index}, remote={remote.path_index}")
-            _ = conn_ssh.get(local=str(self.path_index), remote=str(remote.path_index))
+            with pool.connection() as conn_ssh:
+                _get_index(conn_ssh, str(remote.path_index), self.path_index)
             logger.info(f"Downloaded {GEODEPOT_INDEX} from {remote_name}")
         except Exception as e:
             logger.error(f"Failed to download {GEODEPOT_INDEX} with error: {e}")
 
-    def push(self, remote_name: RemoteName, diff_all: list[IndexDiff]):
-        """Overwrite the remote repository with the changes in the local."""
+    def push(
+        self, remote_name: RemoteName, diff_all: list[IndexDiff], force: bool = False
+    ):
+        """Overwrite the remote repository with the changes in the local.
+
+        :param force: Upload the modified data even if only its metadata changed. By
+            default, only the data with a different sha1 are uploaded, because the
+            metadata is transferred with the index.
+        """
         remote = self.config.remotes.get(remote_name)
         if remote is None:
             raise GeodepotInvalidConfiguration(
@@ -739,102 +1011,167 @@ class Repository:
                 f"The remote '{remote}' must use an ssh/sftp protocol in order to push changes."
             )
 
-        from fabric import Connection
+        from paramiko import SSHException
 
-        # i.status == Status.DELETE, because if the remote does not contain a data, it
-        # shows as it deleted it
-        data_to_upload = set(
-            i.casespec_self
-            for i in diff_all
-            if i.status == Status.DELETE or i.status == Status.MODIFY
-        )
-        # Similarly, i.status == Status.ADD, because the remote contains a data that the
-        # local doesn't, thus it 'adds' it w.r.t to the local. Since we push, we
-        # overwrite the remote, meaning that if the local doesn't contain a specific
-        # data, the remote shouldn't have it either.
-        data_to_delete = set(
-            i.casespec_other for i in diff_all if i.status == Status.ADD
-        )
+        data_to_upload, data_to_delete = _select_push(diff_all, force)
 
-        conn_ssh = Connection(remote.ssh_host)
+        pool = self._connection_pool(remote.ssh_host)
 
-        for data in data_to_upload:
-            if data.is_case:
-                # Upload a whole case
-                case_path_remote = "/".join([remote.path_cases, str(data)])
-                # Create the case dir
+        # Bind once, instead of creating the Paths and strings for each item
+        path_cases = self.path_cases
+        path_cases_remote = remote.path_cases
+        case_paths_remote = [
+            f"{path_cases_remote}/{data}" for data in data_to_upload if data.is_case
+        ]
+        uploads = []
+        case_uploads = []
+        with pool.connection() as conn_ssh:
+            # Create the case dirs, with as few commands as possible. The commands run
+            # in the background while we collect the archives to upload.
+            mkdirs = []
+            for i in range(0, len(case_paths_remote), SSH_ARGS_PER_COMMAND):
+                paths = " ".join(
+                    quote(p) for p in case_paths_remote[i : i + SSH_ARGS_PER_COMMAND]
+                )
                 try:
-                    result = conn_ssh.run(f"mkdir -p {case_path_remote}")
-                    if not result.ok:
-                        logger.error(
-                            f"Failed to create directory {case_path_remote} on {remote.name} with:\n{result.stderr}"
+                    mkdirs.append(
+                        (
+                            paths,
+                            conn_ssh.run(
+                                f"mkdir -p {paths}", asynchronous=True, warn=True
+                            ),
                         )
+                    )
                 except Exception as e:
                     logger.error(
-                        f"Failed to create directory {case_path_remote} on {remote.name} with:\n{e}:"
+                        f"Failed to create directories {paths} on {remote.name} with:\n{e}:"
                     )
-                # Upload each archive in the case
-                for dirpath, dirnames, filenames in self.path_cases.joinpath(
-                    data.to_path()
-                ).walk():
-                    for filename in filenames:
-                        path_local = Path(dirpath, filename)
-                        if path_local.suffixes[-1] == ARCHIVE_EXTENSION:
-                            archive_path_local = path_local
-                            # here data is just the case name
-                            archive_path_remote = "/".join(
-                                [remote.path_cases, str(data), filename]
-                            )
-                            try:
-                                logger.debug(
-                                    f"PUT local={archive_path_local} remote={archive_path_remote}"
-                                )
-                                _ = conn_ssh.put(
-                                    local=archive_path_local, remote=archive_path_remote
-                                )
-                                logger.info(f"Uploaded {data} to {remote.name}")
-                            except Exception as e:
-                                logger.error(
-                                    f"Failed to upload {data} to {remote.name} with:\n{e}"
+
+            for data in data_to_upload:
+                if data.is_case:
+                    # Upload a whole case
+                    case_path_remote = f"{path_cases_remote}/{data}"
+                    # Upload each archive in the case
+                    case_archives = []
+                    for dirpath, dirnames, filenames in walk(
+                        path_cases.joinpath(data.to_path())
+                    ):
+                        for filename in filenames:
+                            if filename.endswith(ARCHIVE_EXTENSION):
+                                # here data is just the case name
+                                case_archives.append(
+                                    (
+                                        data,
+                                        Path(dirpath, filename),
+                                        f"{case_path_remote}/{filename}",
+                                    )
                                 )
-            else:
-                # Upload a single data file
-                casespec_archive = str(data) + ARCHIVE_EXTENSION
-                archive_path_local = self.path_cases.joinpath(casespec_archive)
-                archive_path_remote = "/".join([remote.path_cases, casespec_archive])
+                    case_uploads.append((data, case_archives))
+                else:
+                    # Upload a single data file
+                    casespec_archive = str(data) + ARCHIVE_EXTENSION
+                    archive_path_local = path_cases.joinpath(casespec_archive)
+                    archive_path_remote = f"{path_cases_remote}/{casespec_archive}"
+                    uploads.append((data, archive_path_local, archive_path_remote))
+
+            # The case dirs must exist before we start uploading
+            for paths, promise in mkdirs:
                 try:
-                    logger.debug(
-                        f"PUT local={archive_path_local} remote={archive_path_remote}"
-                    )
-                    _ = conn_ssh.put(
-                        local=archive_path_local, remote=archive_path_remote
-                    )
-                    logger.info(f"Uploaded {data} to {remote.name}")
+                    result = promise.join()
+                    if not result.ok:
+                        logger.error(
+                            f"Failed to create directories {paths} on {remote.name} with:\n{result.stderr}"
+                        )
                 except Exception as e:
-                    logger.error(f"Failed to upload {data} to {remote.name} with:\n{e}")
-        for data in data_to_delete:
-            casespec_archive = str(data) + ARCHIVE_EXTENSION
-            archive_path_remote = "/".join([remote.path_cases, casespec_archive])
-            try:
-                if data.is_case:
-                    # Delete a whole case
-                    case_path_remote = "/".join([remote.path_cases, str(data)])
-                    result = conn_ssh.run(f"rm -rf {case_path_remote}")
-                else:
-                    # Delete a data file
-                    result = conn_ssh.run(f"rm {archive_path_remote}")
-                if not result.ok:
                     logger.error(
-                        f"Failed to delete {data} on {remote.name} with:\n{result.stderr}"
+                        f"Failed to create directories {paths} on {remote.name} with:\n{e}:"
                     )
-                else:
-                    logger.info(f"Deleted {data} on {remote.name}")
+
+        def upload(conn: _ThreadSession, item: tuple[CaseSpec, Path, str]):
+            data, archive_path_local, archive_path_remote = item
+            try:
+                logger.debug(
+                    f"PUT local={archive_path_local} remote={archive_path_remote}"
+                )
+                conn.sftp().put(
+                    str(archive_path_local), archive_path_remote, confirm=False
+                )
+                logger.info(f"Uploaded {data} to {remote.name}")
             except Exception as e:
-                logger.error(f"Failed to delete {data} on {remote.name} with:\n{e}")
+                logger.error(f"Failed to upload {data} to {remote.name} with:\n{e}")
+
+        def upload_case(conn: _ThreadSession, item: tuple[CaseSpec, list]):
+            data, case_archives = item
+            try:
+                _put_tar_stream(
+                    conn,
+                    [
+                        (path_local, f"{data}/{path_local.name}")
+                        for _, path_local, _ in case_archives
+                    ],
+                    path_cases_remote,
+                )
+                logger.info(f"Uploaded {data} to {remote.name}")
+                return
+            except (OSError, SSHException, TarError, GeodepotRuntimeError) as e:
+                logger.warning(
+                    f"Failed to stream {data} to {remote.name} as a tar archive, uploading its files one by one. With:\n{e}"
+                )
+            for case_archive in case_archives:
+                upload(conn, case_archive)
+
+        def run_delete(conn: _ThreadSession, command: str, targets: list) -> bool:
+            paths = " ".join(quote(path_remote) for _, path_remote in targets)
+            try:
+                result = conn.run(f"{command} {paths}", warn=True)
+                if result.ok:
+                    for data, _ in targets:
+                        logger.info(f"Deleted {data} on {remote.name}")
+                    return True
+                error = result.stderr
+            except Exception as e:
+                error = e
+            if len(targets) == 1:
+                logger.error(
+                    f"Failed to delete {targets[0][0]} on {remote.name} with:\n{error}"
+                )
+            return False
+
+        def delete(conn: _ThreadSession, batch: tuple[str, list]):
+            command, targets = batch
+            if not run_delete(conn, command, targets) and len(targets) > 1:
+                # Find out which of the paths could not be deleted
+                for target in targets:
+                    run_delete(conn, command, [target])
+
+        # Delete the files and the whole cases in batches, instead of running a
+        # command for each of them
+        files_to_delete = []
+        cases_to_delete = []
+        for data in data_to_delete:
+            if data.is_case:
+                cases_to_delete.append((data, f"{path_cases_remote}/{data}"))
+            else:
+                files_to_delete.append(
+                    (data, f"{path_cases_remote}/{data}{ARCHIVE_EXTENSION}")
+                )
+        deletions = [
+            (command, targets[i : i + SSH_ARGS_PER_COMMAND])
+            for command, targets in (
+                ("rm -f", files_to_delete),
+                ("rm -rf", cases_to_delete),
+            )
+            for i in range(0, len(targets), SSH_ARGS_PER_COMMAND)
+        ]
+
+        _map_with_connections(pool, upload_case, case_uploads)
+        _map_with_connections(pool, upload, uploads)
+        _map_with_connections(pool, delete, deletions)
 
         try:
             logger.debug(f"PUT local={self.path_index}, remote={remote.path_index}")
-            _ = conn_ssh.put(self.path_index, remote=remote.path_index)
+            with pool.connection() as conn_ssh:
+                _put_index(conn_ssh, self.path_index, remote.path_index)
             logger.info(f"Transferred {GEODEPOT_INDEX} to {remote.name}")
         except Exception as e:
             logger.error(
@@ -848,8 +1185,8 @@ class Repository:
             if (
                 case := self.index.remove_case(case_name=casespec.case_name)
             ) is not None:
-                rmtree(self.path_cases.joinpath(casespec.to_path()))
-                self.index.write(self.path_index)
+                _fast_rmtree(self.path_cases.joinpath(casespec.to_path()))
+                self.write_index()
                 logger.info(f"Removed {case.name} from the repository")
             else:
                 logger.info(f"The case {casespec} does not exist in the repository")
@@ -865,7 +1202,7 @@ class Repository:
                             missing_ok=False
                         )
                         # TODO: I could remove the whole case if there are no more files. Don't forget to remove the case from the index too.
-                    self.index.write(self.path_index)
+                    self.write_index()
                     logger.info(f"Removed {data.name} from the repository")
                 else:
                     logger.info(
@@ -877,8 +1214,29 @@ class Repository:
                 )
 
     def write_index(self):
-        """Serialize the index."""
-        self.index.write(self.path_index)
+        """Serialize the index. Within a `batch`, it is only serialized at the end."""
+        if self._batch_depth > 0:
+            self._index_dirty = True
+        else:
+            self.index.write(self.path_index)
+
+    @contextmanager
+    def batch(self):
+        """Group several modifications of the repository, so that the index is only
+        serialized once, when the outermost batch ends.
+
+        >>> with repo.batch():
+        ...     repo.remove(casespec_a)
+        ...     repo.remove(casespec_b)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._index_dirty:
+                self._index_dirty = False
+                self.write_index()
 
     def _compress_data(self, path: Path) -> Path:
         """Compresses a data item in the repository."""
@@ -897,6 +1255,9 @@ class Repository:
     def _copy_data(self, path: Path, casespec: CaseSpec) -> Path | None:
         """Copies a data entry into the repository.
 
+        The copy is only staged until it is archived by `_compress_data`, and is
+        never modified, so the files are hardlinked where possible.
+
         :returns: The Path to the destination.
         """
         destination = None
@@ -906,14 +1267,11 @@ class Repository:
                 destination = self.path_cases.joinpath(
                     casespec.case_name, casespec.data_name
                 )
-                copy2(
-                    path,
-                    destination,
-                )
+                _link_file(path, destination)
             else:
                 # Keep the file name
                 destination = self.path_cases.joinpath(casespec.case_name, path.name)
-                copy2(path, destination)
+                _link_file(path, destination)
         else:
             if casespec.data_name is not None:
                 # Copying a directory as a single data entry under a new name
@@ -923,6 +1281,7 @@ class Repository:
                 copytree(
                     path,
                     destination,
+                    copy_function=_link_file,
                     dirs_exist_ok=True,
                 )
             else:
@@ -930,6 +1289,7 @@ class Repository:
                 copytree(
                     path,
                     destination,
+                    copy_function=_link_file,
                     dirs_exist_ok=True,
                 )
         return destination
@@ -937,8 +1297,10 @@ class Repository:
     def _decompress_data(self, path: Path, casespec: CaseSpec) -> bool:
         """Decompresses a data entry into the repository."""
         try:
-            with TarFile(path, mode="r") as tf:
-                tf.extractall(path=self.path_cases / casespec.case_name)
+            # Read the archive as a stream in large blocks, instead of seeking through
+            # it in 10 KiB records
+            with tar_open(path, mode="r|", bufsize=TAR_BUFSIZE) as tf:
+                tf.extractall(path=self.path_cases / casespec.case_name, filter="data")
             return True
         except Exception as e:
             logger.critical(f"Failed to decompress {path} with:\n{e}")
@@ -949,8 +1311,9 @@ class Repository:
 
         :raises: GeodepotInvalidRepository"""
         self.path = path
-        self.load_index()
         self.load_config()
+        if not self.path_index.is_file():
+            raise GeodepotInvalidRepository(f"index {self.path_index} does not exist")
         if not self.path_cases.is_dir():
             raise GeodepotInvalidRepository(
                 f"cases directory {self.path_cases} does not exist"
@@ -965,19 +1328,296 @@ class Repository:
         self.path = path
         self.path.mkdir()
         self.path_cases.mkdir()
-        self.index = Index()
-        self.index.write(self.path_index)
+        self._index = Index()
+        self._index.write(self.path_index)
         self.config = Config()
         self.config.write(self.path_config_local)
         logger.info(f"Initialized empty Geodepot repository at {self.path}")
 
 
+@cache
+def _index_definitions() -> tuple[SpatialReference, tuple[FieldDefn, ...]]:
+    """The SRS and the field definitions of the index.
+
+    They are the same for every index, so they are only created once.
+    """
+    index_srs = SpatialReference()
+    index_srs.ImportFromEPSG(GEODEPOT_INDEX_EPSG)
+    index_field_definitions = (
+        FieldDefn("fid", OFTInteger64),
+        FieldDefn("case_name", OFTString),
+        FieldDefn("case_sha1", OFTString),
+        FieldDefn("case_description", OFTString),
+        FieldDefn("data_name", OFTString),
+        FieldDefn("data_sha1", OFTString),
+        FieldDefn("data_description", OFTString),
+        FieldDefn("data_format", OFTString),
+        FieldDefn("data_driver", OFTString),
+        FieldDefn("data_changed_by", OFTString),
+        FieldDefn("data_license", OFTString),
+        FieldDefn("data_srs", OFTString),
+        FieldDefn("data_extent_original_srs", OFTString),
+    )
+    return index_srs, index_field_definitions
+
+
+def _fast_rmtree(path: Path) -> None:
+    """Delete a directory tree.
+
+    Works on the raw str paths that are returned by `os.scandir`, and does not stat
+    the entries, which makes it cheaper than `shutil.rmtree` on directories with many
+    files. Symlinks are removed, not followed.
+    """
+    stack = [fspath(path)]
+    dirpaths = []
+    while stack:
+        dirpath = stack.pop()
+        dirpaths.append(dirpath)
+        with scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    try:
+                        unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+    # Subdirectories always come after their parent in dirpaths
+    for dirpath in reversed(dirpaths):
+        rmdir(dirpath)
+
+
+def _link_file(src, dst):
+    """Hardlink a file, or copy it with `_copy_file` if it cannot be linked (eg.
+    across file systems)."""
+    try:
+        link(src, dst)
+    except FileExistsError:
+        # Replace an existing 'dst' instead of writing into it, because it can be a
+        # link to 'src' itself
+        unlink(dst)
+        return _link_file(src, dst)
+    except OSError:
+        return _copy_file(src, dst)
+    return dst
+
+
+def _copy_file(src, dst):
+    """Copy a file and its metadata, like `shutil.copy2`.
+
+    On file systems with copy-on-write support (eg. Btrfs, XFS), the file is cloned
+    with the FICLONE ioctl, which only copies metadata. Otherwise the contents are
+    copied with `os.copy_file_range`, which stays in the kernel. Falls back to
+    `shutil.copy2` where neither is available or they fail.
+    """
+    if copy_file_range is None:
+        return copy2(src, dst)
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            try:
+                ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                # Not supported by the file system, or across file systems
+                remaining = fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+    except OSError:
+        return copy2(src, dst)
+    copystat(src, dst)
+    return dst
+
+
+def _drop_data_of_cases(casespecs: set[CaseSpec]) -> set[CaseSpec]:
+    """Remove the data items whose case is also in 'casespecs' as a whole."""
+    case_names = {c.case_name for c in casespecs if c.is_case}
+    if len(case_names) == 0:
+        return casespecs
+    return {c for c in casespecs if c.is_case or c.case_name not in case_names}
+
+
+def _select_push(
+    diff_all: list[IndexDiff], force: bool = False
+) -> tuple[set[CaseSpec], set[CaseSpec]]:
+    """Select the local data to upload and the remote data to delete in a push.
+
+    :param force: Also upload the modified data whose sha1 did not change.
+    """
+    # i.status == Status.DELETE, because if the remote does not contain a data, it
+    # shows as it deleted it
+    data_to_upload = {
+        i.casespec_self
+        for i in diff_all
+        if i.status == Status.DELETE
+        or (i.status == Status.MODIFY and (force or i.member == "sha1"))
+    }
+    # Similarly, i.status == Status.ADD, because the remote contains a data that the
+    # local doesn't, thus it 'adds' it w.r.t to the local. Since we push, we
+    # overwrite the remote, meaning that if the local doesn't contain a specific
+    # data, the remote shouldn't have it either.
+    data_to_delete = {i.casespec_other for i in diff_all if i.status == Status.ADD}
+    # Whole cases are transferred or deleted at once, including their data
+    return _drop_data_of_cases(data_to_upload), _drop_data_of_cases(data_to_delete)
+
+
+def _get_index(conn, path_remote: str, path_local: Path) -> None:
+    """Download an index, gzip-compressed on the wire.
+
+    The JSON of the index compresses well, so it is compressed with 'gzip' on the
+    remote and decompressed while it is written to a temporary file, which replaces
+    'path_local' when the download is complete. Falls back to a plain SFTP download
+    if 'gzip' fails on the remote.
+    """
+    from paramiko import SSHException
+
+    path_tmp = path_local.with_name(path_local.name + ".part")
+    try:
+        stdin, stdout, stderr = conn.client.exec_command(
+            f"gzip -c < {quote(path_remote)}", bufsize=TAR_BUFSIZE
+        )
+        stdin.close()
+        with GzipFile(fileobj=stdout, mode="rb") as gz, path_tmp.open("wb") as f:
+            copyfileobj(gz, f, length=TAR_BUFSIZE)
+        if (exit_status := stdout.channel.recv_exit_status()) != 0:
+            raise GeodepotRuntimeError(
+                f"'gzip' exited with status {exit_status}: {stderr.read().decode(errors='replace')}"
+            )
+        path_tmp.replace(path_local)
+    except (OSError, EOFError, SSHException, GeodepotRuntimeError) as e:
+        # A truncated gzip stream raises EOFError
+        path_tmp.unlink(missing_ok=True)
+        logger.debug(f"Compressed download of {path_remote} failed, using SFTP: {e}")
+        conn.sftp().get(path_remote, str(path_local))
+
+
+def _put_index(conn, path_local: Path, path_remote: str) -> None:
+    """Upload an index, gzip-compressed on the wire.
+
+    The index is decompressed on the remote into a temporary file, which replaces
+    'path_remote' when the upload is complete, so that an interrupted upload does not
+    leave a truncated index on the remote. Falls back to a plain SFTP upload if
+    'gzip' fails on the remote.
+    """
+    from paramiko import SSHException
+
+    path_tmp = quote(f"{path_remote}.part")
+    try:
+        stdin, stdout, stderr = conn.client.exec_command(
+            f"gzip -dc > {path_tmp} && mv {path_tmp} {quote(path_remote)}",
+            bufsize=TAR_BUFSIZE,
+        )
+        with path_local.open("rb") as f, GzipFile(fileobj=stdin, mode="wb") as gz:
+            copyfileobj(f, gz, length=TAR_BUFSIZE)
+        stdin.close()
+        if (exit_status := stdout.channel.recv_exit_status()) != 0:
+            raise GeodepotRuntimeError(
+                f"'gzip' exited with status {exit_status}: {stderr.read().decode(errors='replace')}"
+            )
+    except (OSError, SSHException, GeodepotRuntimeError) as e:
+        logger.debug(f"Compressed upload of {path_local} failed, using SFTP: {e}")
+        conn.sftp().put(str(path_local), path_remote, confirm=False)
+
+
+def _get_index_http(url: str, path_local: Path) -> None:
+    """Download an index over HTTP, unless the copy at 'path_local' is up to date.
+
+    The ETag of the downloaded index is stored next to it, and sent back in
+    'If-None-Match', so that the server can answer with '304 Not Modified'.
+    """
+    from requests import get as requests_get
+
+    path_etag = path_local.with_name(path_local.name + ".etag")
+    headers = {}
+    if path_local.is_file() and path_etag.is_file():
+        headers["If-None-Match"] = path_etag.read_text()
+    with requests_get(url, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            logger.debug(f"The index at {url} did not change since the last download")
+            return
+        response.raise_for_status()
+        path_part = path_local.with_name(path_local.name + ".part")
+        _stream_to_file(response, path_part)
+        path_part.replace(path_local)
+        if (etag := response.headers.get("ETag")) is not None:
+            path_etag.write_text(etag)
+        else:
+            path_etag.unlink(missing_ok=True)
+
+
+def _map_with_connections(pool: _ConnectionPool, func, items) -> None:
+    """Call `func(session, item)` for each item, on TRANSFER_WORKERS threads.
+
+    The threads share the connection of the 'pool', and each of them has its own
+    `_ThreadSession` on it. The SFTP sessions are closed when all items are done, so
+    they don't add up towards the session limit of the server (MaxSessions). 'func'
+    is expected to handle its own errors.
+    """
+    local = thread_local()
+    sessions = []
+    sessions_lock = Lock()
+
+    with pool.connection() as conn:
+
+        def call(item):
+            if (session := getattr(local, "session", None)) is None:
+                session = local.session = _ThreadSession(conn)
+                with sessions_lock:
+                    sessions.append(session)
+            func(session, item)
+
+        try:
+            with ThreadPoolExecutor(max_workers=TRANSFER_WORKERS) as executor:
+                for _ in executor.map(call, items):
+                    pass
+        finally:
+            for session in sessions:
+                session.close()
+
+
+def _put_tar_stream(conn, files: list[tuple[Path, str]], path_remote: str) -> None:
+    """Upload files by streaming them as a tar archive into 'tar' on the remote.
+
+    This sends all files in a single stream, instead of paying an SFTP round-trip for
+    each of them.
+
+    :param conn: An open Fabric connection.
+    :param files: The local path and the path in the archive of each file. The paths
+        in the archive are relative to 'path_remote'.
+    :param path_remote: The directory on the remote to extract the files into.
+    :raises GeodepotRuntimeError: If 'tar' fails on the remote.
+    """
+    stdin, stdout, stderr = conn.client.exec_command(
+        f"tar -xf - -C {quote(path_remote)}", bufsize=TAR_BUFSIZE
+    )
+    with tar_open(fileobj=stdin, mode="w|", bufsize=TAR_BUFSIZE) as tf:
+        for path_local, arcname in files:
+            tf.add(path_local, arcname=arcname, recursive=False)
+    # Flush the buffered stdin and send EOF, so that tar finishes
+    stdin.close()
+    if (exit_status := stdout.channel.recv_exit_status()) != 0:
+        raise GeodepotRuntimeError(
+            f"'tar' exited with status {exit_status} on {conn.host}: {stderr.read().decode(errors='replace')}"
+        )
+
+
+def _stream_to_file(response, path: Path) -> None:
+    """Write the body of a streamed `requests` response to a file.
+
+    The body is copied in chunks of 1 MiB, so it is never held in memory as a whole.
+    """
+    response.raw.decode_content = True
+    with path.open("wb") as f:
+        copyfileobj(response.raw, f, length=1 << 20)
+
+
 def parse_pathspec(pathspec: str, as_data: bool = False) -> list[Path]:
     """Parse a path specifier and return a list of Paths that needs to be added to the
     case.
     :param pathspec: Can be relative or absolute path or a fileglob. Fileglobs cannot be used together with `as_data`.
     :param as_data: Treat a directory as a single file, effectively returning a single path. Only has effect if `pathspec` is a path to a directory.
-    :return: List of paths.
+    :return: List of paths, sorted.
     """
     if (is_glob := "*" in pathspec) is not True:
         if not Path(pathspec).exists():
@@ -988,7 +1628,7 @@ def parse_pathspec(pathspec: str, as_data: bool = False) -> list[Path]:
             raise ValueError(
                 "Cannot use a fileglob as path specifier and 'as_data' at the same time. To add a whole directory as a single data file, provide the full path to the directory and set the '--as-data' option."
             )
-        return list(Path(".").glob(pathspec))
+        return sorted(Path(".").glob(pathspec))
 
     input_path = Path(pathspec).resolve(strict=True)
     if input_path.is_file() or as_data:
@@ -996,9 +1636,18 @@ def parse_pathspec(pathspec: str, as_data: bool = False) -> list[Path]:
             input_path,
         ]
     else:
-        return [
-            dirpath / fname
-            for dirpath, dirnames, filenames in input_path.walk()
-            if len(filenames) > 0
-            for fname in filenames
-        ]
+        # Walk the plain str paths with scandir, so only the files are converted to
+        # Path. Like os.walk, symlinks to directories are not followed. The paths are
+        # sorted, so that the last of the files with the same name wins in `add`,
+        # independent of the order of the walk.
+        paths = []
+        stack = [fspath(input_path)]
+        while stack:
+            with scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                    else:
+                        paths.append(Path(entry.path))
+        return sorted(paths)
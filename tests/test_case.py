@@ -1,7 +1,10 @@
+from copy import deepcopy
+
 import pytest
 
 from geodepot.case import CaseSpec, Case
-from geodepot.data import Data
+from geodepot.config import User
+from geodepot.data import Data, DataName
 
 
 @pytest.mark.parametrize(
@@ -24,3 +27,53 @@ def test_case(data_dir):
     for df in ("wippolder.gpkg", "wippolder.las", "3dbag_one.city.json"):
         case.add_data(Data(data_dir / df))
     print(case)
+
+
+@pytest.fixture(scope="function")
+def case_wippolder(data_dir) -> Case:
+    case = Case("wippolder", "Some case description.")
+    case.add_data(
+        Data(
+            data_dir / "wippolder.gpkg",
+            changed_by=User("Kovács János", "janos@kovacs.me"),
+        )
+    )
+    return case
+
+
+def test_shallow_clone(case_wippolder, data_dir):
+    """Are the data of a shallow clone added and removed independently?"""
+    clone = case_wippolder.shallow_clone()
+    assert clone == case_wippolder
+    clone.add_data(Data(data_dir / "wippolder.las"))
+    clone.data.pop(DataName("wippolder.gpkg"))
+    assert list(case_wippolder.data) == ["wippolder.gpkg"]
+    assert list(clone.data) == ["wippolder.las"]
+
+
+def test_shallow_clone_shares_data(case_wippolder):
+    """Does a shallow clone share the data items with the original?"""
+    clone = case_wippolder.shallow_clone()
+    name = DataName("wippolder.gpkg")
+    assert clone.data is not case_wippolder.data
+    assert clone.data[name] is case_wippolder.data[name]
+
+
+def test_deepcopy(case_wippolder, data_dir):
+    """Is a deep copy independent of the original?"""
+    clone = deepcopy(case_wippolder)
+    assert clone == case_wippolder
+    name = DataName("wippolder.gpkg")
+    data_clone = clone.data[name]
+    assert data_clone is not case_wippolder.data[name]
+    data_clone.description = "Modified description"
+    data_clone.changed_by.name = "Remote User"
+    data_clone.bbox.srs_wkt = None
+    clone.add_data(Data(data_dir / "wippolder.las"))
+    data_original = case_wippolder.data[name]
+    assert list(case_wippolder.data) == ["wippolder.gpkg"]
+    assert data_original.description is None
+    assert data_original.changed_by.name == "Kovács János"
+    assert data_original.bbox.srs_wkt is not None
+    # The immutable bboxes are shared
+    assert data_clone.bbox.bbox_original_srs is data_original.bbox.bbox_original_srs
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import pytest
 
 from geodepot.repository import Repository
@@ -217,3 +219,31 @@ def test_remote_create(url_with_path, url, path, is_ssh):
         assert remote.is_ssh is False
         assert remote.url == url
         assert remote.path_index == f"{url}/index.geojson"
+
+
+def test_config_write(tmp_path):
+    """Is the config replaced as a whole, without leaving a temporary file behind?"""
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    config = Config(user=User(name="myname", email="<EMAIL>"))
+    config.write(path)
+    assert Config.load(path) == config
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_config_write_interrupted(tmp_path, monkeypatch):
+    """Is the existing config kept if writing the new config fails halfway?"""
+    path = tmp_path / "config.json"
+    Config(user=User(name="myname", email="<EMAIL>")).write(path)
+    config_before = path.read_bytes()
+    write_bytes = Path.write_bytes
+
+    def mock_write_bytes(self, data):
+        write_bytes(self, data[:10])
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(Path, "write_bytes", mock_write_bytes)
+    with pytest.raises(OSError):
+        Config(user=User(name="other", email="<EMAIL>")).write(path)
+    monkeypatch.undo()
+    assert path.read_bytes() == config_before
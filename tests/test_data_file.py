@@ -1,6 +1,12 @@
 import pytest
 
-from geodepot.data import Data, is_cityjson, try_ogr, try_pdal
+from geodepot.data import (
+    Data,
+    bbox_from_las_header,
+    is_cityjson,
+    try_ogr,
+    try_pdal,
+)
 
 
 @pytest.mark.parametrize(
@@ -13,6 +19,33 @@ def test_data_file(mock_proj_lib, wippolder_dir, file_name):
     assert data_file.bbox is not None
 
 
+def test_bbox_from_las_header(wippolder_dir):
+    """Do we read the extent from the right fields of the LAS header?"""
+    bbox = bbox_from_las_header(wippolder_dir / "wippolder.las")
+    # The extent of the points, as computed by PDAL filters.stats
+    assert bbox.minx == pytest.approx(85266.56097, abs=1e-3)
+    assert bbox.miny == pytest.approx(447017.954, abs=1e-3)
+    assert bbox.maxx == pytest.approx(85530.10597, abs=1e-3)
+    assert bbox.maxy == pytest.approx(447214.746, abs=1e-3)
+
+
+def test_bbox_from_las_header_not_las(wippolder_dir):
+    assert bbox_from_las_header(wippolder_dir / "wippolder.gpkg") is None
+
+
+@pytest.mark.parametrize("las_header_extent", (False, True))
+def test_data_file_las_extent(wippolder_dir, las_header_extent):
+    """Is the extent from the LAS header the same as the extent of the points?"""
+    data_file = Data(
+        wippolder_dir / "wippolder.las", las_header_extent=las_header_extent
+    )
+    bbox = data_file.bbox.bbox_original_srs
+    assert bbox.minx == pytest.approx(85266.56097, abs=1e-3)
+    assert bbox.miny == pytest.approx(447017.954, abs=1e-3)
+    assert bbox.maxx == pytest.approx(85530.10597, abs=1e-3)
+    assert bbox.maxy == pytest.approx(447214.746, abs=1e-3)
+
+
 class TestFormatInference:
     @pytest.mark.parametrize(
         "suffixes,expected",
@@ -1,8 +1,16 @@
+import errno
 from copy import deepcopy
+from io import BytesIO
+from pathlib import Path
+from shutil import copy2
 
 import pytest
+from click.testing import CliRunner
+from requests import HTTPError
 
-from geodepot.repository import Repository, Index
+from geodepot import data, repository
+from geodepot.cli import geodepot_grp
+from geodepot.repository import Repository, Index, _get_index_http
 from geodepot.case import CaseSpec, CaseName
 from geodepot.data import DataName
 from geodepot.config import RemoteName
@@ -41,6 +49,90 @@ def test_remove_data(repo, wippolder_dir):
     assert repo.get_data(casespec) is None
 
 
+@pytest.fixture(scope="function")
+def index_writes(monkeypatch) -> list:
+    """Record the paths that the index is serialized to."""
+    writes = []
+    index_write = Index.write
+
+    def mock_write(self, path):
+        writes.append(path)
+        index_write(self, path)
+
+    monkeypatch.setattr(Index, "write", mock_write)
+    return writes
+
+
+def test_remove_batch(repo, wippolder_dir, index_writes):
+    """Is the index serialized only once, when removing several entries in a batch?"""
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.gpkg"))
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.las"))
+    index_writes.clear()
+    with repo.batch():
+        repo.remove(CaseSpec("wippolder", "wippolder.gpkg"))
+        repo.remove(CaseSpec("wippolder", "wippolder.las"))
+        # Nested serializations are deferred to the end of the batch
+        repo.write_index()
+        assert index_writes == []
+    assert index_writes == [repo.path_index]
+    assert Index.load(repo.path_index).cases[CaseName("wippolder")].data == {}
+
+
+def test_batch_nested(repo, wippolder_dir, index_writes):
+    """Is the index serialized only once, when the outermost batch ends?"""
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.gpkg"))
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.las"))
+    index_writes.clear()
+    with repo.batch():
+        with repo.batch():
+            repo.remove(CaseSpec("wippolder", "wippolder.gpkg"))
+        repo.remove(CaseSpec("wippolder", "wippolder.las"))
+        assert index_writes == []
+    assert index_writes == [repo.path_index]
+    assert Index.load(repo.path_index).cases[CaseName("wippolder")].data == {}
+
+
+def test_batch_exception(repo, wippolder_dir, index_writes):
+    """Are the modifications before an exception in a batch still serialized?"""
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.gpkg"))
+    index_writes.clear()
+    with pytest.raises(ValueError), repo.batch():
+        repo.remove(CaseSpec("wippolder"))
+        raise ValueError
+    assert index_writes == [repo.path_index]
+    assert CaseName("wippolder") not in Index.load(repo.path_index).cases
+    # The batch has ended, so the index is serialized right away again
+    repo.write_index()
+    assert len(index_writes) == 2
+
+
+def test_batch_unmodified(repo, index_writes):
+    """Is the index not serialized if nothing changed in the batch?"""
+    with repo.batch():
+        pass
+    assert index_writes == []
+
+
+def test_remove_cli(repo, wippolder_dir, index_writes):
+    """Can we remove several entries with a single command?"""
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.gpkg"))
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.las"))
+    index_writes.clear()
+    result = CliRunner().invoke(
+        geodepot_grp, ["remove", "wippolder/wippolder.gpkg", "wippolder/wippolder.las"]
+    )
+    assert result.exit_code == 0
+    assert len(index_writes) == 1
+    assert Index.load(repo.path_index).cases[CaseName("wippolder")].data == {}
+
+
+def test_invalid_repository_cli(repo):
+    """Is an invalid repository reported without a traceback?"""
+    result = CliRunner().invoke(geodepot_grp, ["fetch", "no-such-remote"])
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
+
+
 def test_empty(repo):
     """Can we create an empty repository?"""
     assert repo.path.exists()
@@ -69,12 +161,39 @@ def test_index_serialize(repo, wippolder_dir):
     assert repo.path.joinpath("index.geojson").exists()
 
 
+def test_index_write_failure(repo, wippolder_dir):
+    """Is the index kept if serializing it fails halfway?"""
+    repo.add("wippolder", pathspec=str(wippolder_dir / "wippolder.gpkg"))
+    index_before = repo.path_index.read_bytes()
+    # Fails when the feature of the data item is written
+    repo.get_data(CaseSpec("wippolder", "wippolder.gpkg")).changed_by = "not a User"
+    repo.index.write(repo.path_index)
+    assert repo.path_index.read_bytes() == index_before
+    assert list(repo.path.glob("*.tmp*")) == []
+
+
 def test_index_load(data_dir):
     """Can we deserialize the index?"""
     index = Index.load(data_dir / "test_index.geojson")
     assert CaseName("wippolder") in index.cases
 
 
+def test_index_load_json_ogr(repo, wippolder_dir):
+    """Does the index parsed as JSON equal the index read with OGR?"""
+    repo.add(
+        "wippolder",
+        pathspec=str(wippolder_dir),
+        description="wippolder case description",
+        license="CC-0",
+    )
+    repo.index.write(repo.path_index)
+    # A Path is parsed as JSON, a str is read with OGR
+    index_json = Index.load(repo.path_index)
+    index_ogr = Index.load(str(repo.path_index))
+    assert len(index_json.cases[CaseName("wippolder")].data) == 5
+    assert index_json == index_ogr
+
+
 def test_index_load_remote(repo):
     repo.config.add_remote(
         "origin", "https://data.3dgi.xyz/geodepot-test-data/mock_project/.geodepot"
@@ -84,6 +203,155 @@ def test_index_load_remote(repo):
     assert CaseName("wippolder") in repo.index_remote.cases
 
 
+class MockResponse:
+    """A streamed `requests` response."""
+
+    def __init__(self, status_code: int, content: bytes = b"", headers=None):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+        self.raw = BytesIO(content)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code}")
+
+
+@pytest.fixture(scope="function")
+def mock_requests_get(monkeypatch):
+    """Answer the requests with the queued responses, and record their headers."""
+    responses = []
+    request_headers = []
+
+    def mock_get(url, headers=None, **kwargs):
+        request_headers.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr("requests.get", mock_get)
+    return responses, request_headers
+
+
+def test_get_index_http(tmp_path, mock_requests_get):
+    """Is the remote index only downloaded again if it changed?"""
+    responses, request_headers = mock_requests_get
+    path_local = tmp_path / "remote_origin_index.geojson"
+    path_etag = tmp_path / "remote_origin_index.geojson.etag"
+    responses.append(MockResponse(200, b"index v1", {"ETag": '"v1"'}))
+    _get_index_http("https://example.com/index.geojson", path_local)
+    assert request_headers[-1] == {}
+    assert path_local.read_bytes() == b"index v1"
+    assert path_etag.read_text() == '"v1"'
+
+    # Not modified, the local copy is kept
+    responses.append(MockResponse(304))
+    _get_index_http("https://example.com/index.geojson", path_local)
+    assert request_headers[-1] == {"If-None-Match": '"v1"'}
+    assert path_local.read_bytes() == b"index v1"
+
+    # Modified, and the server does not send an ETag anymore
+    responses.append(MockResponse(200, b"index v2"))
+    _get_index_http("https://example.com/index.geojson", path_local)
+    assert path_local.read_bytes() == b"index v2"
+    assert not path_etag.exists()
+    assert list(tmp_path.glob("*.part")) == []
+
+
+def test_get_index_http_error(tmp_path, mock_requests_get):
+    """Is the local copy kept if the download fails?"""
+    responses, _ = mock_requests_get
+    path_local = tmp_path / "remote_origin_index.geojson"
+    path_local.write_bytes(b"index v1")
+    responses.append(MockResponse(500))
+    with pytest.raises(HTTPError):
+        _get_index_http("https://example.com/index.geojson", path_local)
+    assert path_local.read_bytes() == b"index v1"
+
+
+@pytest.fixture(scope="function")
+def src_file(tmp_path) -> Path:
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"some data" * 1000)
+    return src
+
+
+def raise_oserror(*args, **kwargs):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def test_link_file(tmp_path, src_file):
+    """Is the file hardlinked?"""
+    dst = tmp_path / "dst.bin"
+    repository._link_file(src_file, dst)
+    assert dst.stat().st_ino == src_file.stat().st_ino
+
+
+def test_link_file_exists(tmp_path, src_file):
+    """Is an existing destination replaced, instead of written into?"""
+    dst = tmp_path / "dst.bin"
+    dst.write_bytes(b"old data")
+    repository._link_file(src_file, dst)
+    assert dst.stat().st_ino == src_file.stat().st_ino
+    assert src_file.read_bytes() == b"some data" * 1000
+
+
+def test_link_file_cannot_link(tmp_path, src_file, monkeypatch):
+    """Is the file copied if it cannot be linked, eg. across file systems?"""
+    monkeypatch.setattr(repository, "link", raise_oserror)
+    dst = tmp_path / "dst.bin"
+    repository._link_file(src_file, dst)
+    assert dst.stat().st_ino != src_file.stat().st_ino
+    assert dst.read_bytes() == src_file.read_bytes()
+
+
+@pytest.mark.skipif(
+    repository.copy_file_range is None, reason="Requires os.copy_file_range"
+)
+def test_copy_file_no_clone(tmp_path, src_file, monkeypatch):
+    """Is the file copied with copy_file_range if it cannot be cloned?"""
+    monkeypatch.setattr(repository, "ioctl", raise_oserror)
+    dst = tmp_path / "dst.bin"
+    repository._copy_file(src_file, dst)
+    assert dst.read_bytes() == src_file.read_bytes()
+    assert dst.stat().st_mtime_ns == src_file.stat().st_mtime_ns
+
+
+@pytest.mark.skipif(
+    repository.copy_file_range is None, reason="Requires os.copy_file_range"
+)
+def test_copy_file_fallback(tmp_path, src_file, monkeypatch):
+    """Is the file copied with copy2 if neither cloning nor copy_file_range work?"""
+    monkeypatch.setattr(repository, "ioctl", raise_oserror)
+    monkeypatch.setattr(repository, "copy_file_range", raise_oserror)
+    dst = tmp_path / "dst.bin"
+    repository._copy_file(src_file, dst)
+    assert dst.read_bytes() == src_file.read_bytes()
+    assert dst.stat().st_mtime_ns == src_file.stat().st_mtime_ns
+
+
+def test_fast_rmtree(tmp_path):
+    """Is the tree deleted, without following the symlinks in it?"""
+    outside = tmp_path / "outside"
+    (outside / "subdir").mkdir(parents=True)
+    (outside / "subdir" / "keep.txt").write_text("keep")
+    (outside / "keep.txt").write_text("keep")
+    tree = tmp_path / "tree"
+    (tree / "a" / "b").mkdir(parents=True)
+    (tree / "file.txt").write_text("delete")
+    (tree / "a" / "b" / "file.txt").write_text("delete")
+    (tree / "a" / "link_dir").symlink_to(outside, target_is_directory=True)
+    (tree / "a" / "link_file").symlink_to(outside / "keep.txt")
+    (tree / "a" / "dangling").symlink_to(tmp_path / "does_not_exist")
+    repository._fast_rmtree(tree)
+    assert not tree.exists()
+    assert (outside / "keep.txt").read_text() == "keep"
+    assert (outside / "subdir" / "keep.txt").read_text() == "keep"
+
+
 def test_add_files(repo, wippolder_dir):
     """Can we add individaual files?"""
     repo.add(
@@ -118,6 +386,71 @@ def test_add_directory(repo, wippolder_dir):
     assert len(case_wippolder.data) == 5
 
 
+def test_add_same_name(repo, wippolder_dir, tmp_path):
+    """Can we add files with the same name from different directories?"""
+    sources = tmp_path / "sources"
+    for subdir, file_name in (("a", "wippolder.gpkg"), ("b", "wippolder_changed.gpkg")):
+        (sources / subdir).mkdir(parents=True)
+        copy2(wippolder_dir / file_name, sources / subdir / "wippolder.gpkg")
+    repo.add("wippolder", pathspec=str(sources))
+    case_wippolder = repo.get_case(CaseSpec(case_name="wippolder"))
+    assert list(case_wippolder.data) == ["wippolder.gpkg"]
+    # The paths are stored in sorted order, so the file in "b" wins
+    assert (
+        case_wippolder.data["wippolder.gpkg"].sha1
+        == "ed8b3ccbaf14970a402efd68f7bfa7db20a2543a"
+    )
+    assert (repo.path_cases / "wippolder" / "wippolder.gpkg.tar").exists()
+    assert not (repo.path_cases / "wippolder" / "wippolder.gpkg").exists()
+
+
+def test_add_unreadable(repo, wippolder_dir, tmp_path, monkeypatch):
+    """Is nothing stored in the case if one of the paths cannot be read?"""
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    copy2(wippolder_dir / "wippolder.gpkg", sources / "wippolder.gpkg")
+    (sources / "unreadable.gpkg").write_bytes(b"not a geopackage")
+    infer_format = data.Data._infer_format
+
+    def mock_infer_format(path):
+        if path.name == "unreadable.gpkg":
+            raise ValueError(f"Cannot determine format of {path}")
+        return infer_format(path)
+
+    monkeypatch.setattr(data.Data, "_infer_format", staticmethod(mock_infer_format))
+    with pytest.raises(ValueError):
+        repo.add("wippolder", pathspec=str(sources))
+    assert list((repo.path_cases / "wippolder").iterdir()) == []
+    assert repo.get_case(CaseSpec("wippolder")).data == {}
+
+
+def test_add_las_header_extent_cli(repo, wippolder_dir, monkeypatch):
+    """Is the extent of a LAS file taken from its header with --las-header-extent?"""
+    calls = []
+    bbox_from_las_header = data.bbox_from_las_header
+
+    def mock_bbox_from_las_header(path):
+        calls.append(path)
+        return bbox_from_las_header(path)
+
+    monkeypatch.setattr(data, "bbox_from_las_header", mock_bbox_from_las_header)
+    result = CliRunner().invoke(
+        geodepot_grp,
+        [
+            "add",
+            "--las-header-extent",
+            "wippolder",
+            str(wippolder_dir / "wippolder.las"),
+        ],
+    )
+    assert result.exit_code == 0
+    assert calls == [(wippolder_dir / "wippolder.las").resolve()]
+    case_wippolder = Index.load(repo.path_index).cases[CaseName("wippolder")]
+    bbox = case_wippolder.data[DataName("wippolder.las")].bbox.bbox_original_srs
+    assert bbox.minx == pytest.approx(85266.56097, abs=1e-3)
+    assert bbox.maxy == pytest.approx(447214.746, abs=1e-3)
+
+
 def test_add_directory_as_data(repo, wippolder_dir):
     """Can we add a directory as a single data entry?"""
     repo.add("wippolder/wippolder_data_file", pathspec=str(wippolder_dir), as_data=True)
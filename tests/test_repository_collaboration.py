@@ -1,20 +1,26 @@
-from copy import deepcopy
-from pathlib import Path
+import os
+from copy import copy
 
 import pytest
 
-from geodepot.repository import Repository, Index, Status, format_indexdiffs
-from geodepot.case import CaseName, Case
+from geodepot.repository import (
+    Repository,
+    Index,
+    Status,
+    format_indexdiffs,
+    _select_push,
+)
+from geodepot.case import CaseName, Case, CaseSpec
 from geodepot.data import Data, DataName, BBoxSRS, BBox, Drivers
-from geodepot.config import User
+from geodepot.config import User, RemoteName
 
+# The SRS of the wippolder data, shared by the Data fixtures
+SRS_WKT_RD_NEW = 'PROJCS["Amersfoort / RD New",GEOGCS["Amersfoort",DATUM["Amersfoort",SPHEROID["Bessel 1841",6377397.155,299.1528128,AUTHORITY["EPSG","7004"]],AUTHORITY["EPSG","6289"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4289"]],PROJECTION["Oblique_Stereographic"],PARAMETER["latitude_of_origin",52.1561605555556],PARAMETER["central_meridian",5.38763888888889],PARAMETER["scale_factor",0.9999079],PARAMETER["false_easting",155000],PARAMETER["false_northing",463000],UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","28992"]]'
 
-@pytest.fixture
-def mock_temp_project(tmp_path, monkeypatch):
-    def mockreturn():
-        return tmp_path
 
-    monkeypatch.setattr(Path, "cwd", mockreturn)
+def make_index(*cases: Case) -> Index:
+    """Build an Index from the cases."""
+    return Index(cases={case.name: case for case in cases})
 
 
 @pytest.fixture(scope="function")
@@ -33,7 +39,7 @@ def user_remote() -> User:
     return User(name="Remote User", email="remote@user.me")
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def case_wippolder(user_local) -> Case:
     return Case(
         name=CaseName("wippolder"),
@@ -44,7 +50,7 @@ def case_wippolder(user_local) -> Case:
     )
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def data_wippolder_gpkg(user_local) -> Data:
     df = Data.__new__(Data)
     df.name = DataName("wippolder.gpkg")
@@ -64,12 +70,12 @@ def data_wippolder_gpkg(user_local) -> Data:
         bbox_original_srs=BBox(
             minx=85289.890625, miny=447041.96875, maxx=85466.6953125, maxy=447163.53125
         ),
-        srs_wkt='PROJCS["Amersfoort / RD New",GEOGCS["Amersfoort",DATUM["Amersfoort",SPHEROID["Bessel 1841",6377397.155,299.1528128,AUTHORITY["EPSG","7004"]],AUTHORITY["EPSG","6289"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4289"]],PROJECTION["Oblique_Stereographic"],PARAMETER["latitude_of_origin",52.1561605555556],PARAMETER["central_meridian",5.38763888888889],PARAMETER["scale_factor",0.9999079],PARAMETER["false_easting",155000],PARAMETER["false_northing",463000],UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","28992"]]',
+        srs_wkt=SRS_WKT_RD_NEW,
     )
     return df
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def data_wippolder_gpkg_modified(user_remote) -> Data:
     df = Data.__new__(Data)
     df.name = DataName("wippolder.gpkg")
@@ -89,12 +95,12 @@ def data_wippolder_gpkg_modified(user_remote) -> Data:
         bbox_original_srs=BBox(
             minx=85304.3515625, miny=447041.96875, maxx=85438.7265625, maxy=447132.09375
         ),
-        srs_wkt='PROJCS["Amersfoort / RD New",GEOGCS["Amersfoort",DATUM["Amersfoort",SPHEROID["Bessel 1841",6377397.155,299.1528128,AUTHORITY["EPSG","7004"]],AUTHORITY["EPSG","6289"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4289"]],PROJECTION["Oblique_Stereographic"],PARAMETER["latitude_of_origin",52.1561605555556],PARAMETER["central_meridian",5.38763888888889],PARAMETER["scale_factor",0.9999079],PARAMETER["false_easting",155000],PARAMETER["false_northing",463000],UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],AXIS["Northing",NORTH],AUTHORITY["EPSG","28992"]]',
+        srs_wkt=SRS_WKT_RD_NEW,
     )
     return df
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def data_wippolder_las(user_local) -> Data:
     df = Data.__new__(Data)
     df.name = DataName("wippolder.las")
@@ -117,10 +123,10 @@ def data_wippolder_las(user_local) -> Data:
 def test_add_case(case_wippolder, user_local, user_remote):
     """Can we report that a new case was added by the remote?"""
     # Added by remote
-    case_remote = deepcopy(case_wippolder)
+    case_remote = case_wippolder.shallow_clone()
     case_remote.changed_by = user_remote
-    index_local = Index()
-    (index_remote := Index()).add_case(case_remote)
+    index_local = make_index()
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     assert len(diff_all) == 1
     assert diff_all[0].status == Status.ADD
@@ -130,9 +136,9 @@ def test_add_case(case_wippolder, user_local, user_remote):
 def test_delete_case(case_wippolder, user_local, user_remote):
     """Can we report that a case was deleted by the remote?"""
     # Deleted by remote
-    case_local = deepcopy(case_wippolder)
-    (index_local := Index()).add_case(case_local)
-    index_remote = Index()
+    case_local = case_wippolder.shallow_clone()
+    index_local = make_index(case_local)
+    index_remote = make_index()
     diff_all = index_local.diff(index_remote)
     assert len(diff_all) == 1
     assert diff_all[0].status == Status.DELETE
@@ -148,10 +154,12 @@ def test_add_data(
 ):
     """Can we report that a new data was added by the remote?"""
     # Added by remote
-    case_local = deepcopy(case_wippolder)
-    (case_remote := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg_modified)
-    (index_local := Index()).add_case(case_local)
-    (index_remote := Index()).add_case(case_remote)
+    case_local = case_wippolder.shallow_clone()
+    (case_remote := case_wippolder.shallow_clone()).add_data(
+        data_wippolder_gpkg_modified
+    )
+    index_local = make_index(case_local)
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     assert len(diff_all) == 1
     assert diff_all[0].status == Status.ADD
@@ -167,13 +175,15 @@ def test_delete_data(
 ):
     """Can we report that a data was deleted by the remote?"""
     # Deleted by remote
-    (case_local := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg)
-    (case_remote := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg_modified)
+    (case_local := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    (case_remote := case_wippolder.shallow_clone()).add_data(
+        data_wippolder_gpkg_modified
+    )
     case_remote.remove_data(DataName("wippolder.gpkg"))
     # Mimic that another user deleted the data
     case_remote.changed_by = user_remote
-    (index_local := Index()).add_case(case_local)
-    (index_remote := Index()).add_case(case_remote)
+    index_local = make_index(case_local)
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     assert len(diff_all) == 1
     assert diff_all[0].status == Status.DELETE
@@ -183,14 +193,14 @@ def test_delete_data(
 def test_modify_case(case_wippolder, user_remote):
     """Can we report that a case was modified? Even if the case doesn't contain data?"""
     # Modified by remote
-    case_local = deepcopy(case_wippolder)
-    case_remote = deepcopy(case_wippolder)
+    case_local = case_wippolder.shallow_clone()
+    case_remote = case_wippolder.shallow_clone()
     case_local.description = "Local description"
     case_remote.description = "New description on remote"
     # Mimic that another user deleted the data
     case_remote.changed_by = user_remote
-    (index_local := Index()).add_case(case_local)
-    (index_remote := Index()).add_case(case_remote)
+    index_local = make_index(case_local)
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     assert len(diff_all) == 1
     for d in diff_all:
@@ -207,10 +217,12 @@ def test_modify_data(
 ):
     """Can we report that a data was modified?"""
     # Modified by remote
-    (case_local := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg)
-    (case_remote := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg_modified)
-    (index_local := Index()).add_case(case_local)
-    (index_remote := Index()).add_case(case_remote)
+    (case_local := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    (case_remote := case_wippolder.shallow_clone()).add_data(
+        data_wippolder_gpkg_modified
+    )
+    index_local = make_index(case_local)
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     # There are 3 differences, not 4, because the 'changed_by' is reported separately
     assert len(diff_all) == 3
@@ -225,27 +237,76 @@ def test_modify_data(
         assert d.status == Status.MODIFY
 
 
+def test_modify_bbox_same_content(case_wippolder, data_wippolder_gpkg):
+    """Can we report a modified bbox, even if the data contents are the same?"""
+    # Eg. the bbox was computed differently on the remote
+    (data_remote := copy(data_wippolder_gpkg)).bbox = BBoxSRS(
+        bbox_original_srs=data_wippolder_gpkg.bbox.bbox_original_srs,
+        srs_wkt=SRS_WKT_RD_NEW,
+    )
+    (case_local := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    (case_remote := case_wippolder.shallow_clone()).add_data(data_remote)
+    diff_all = make_index(case_local).diff(make_index(case_remote))
+    assert len(diff_all) == 1
+    assert diff_all[0].status == Status.MODIFY
+    assert diff_all[0].member == "bbox_epsg_3857"
+
+
+@pytest.mark.parametrize("force", (False, True))
+def test_push_metadata_only(case_wippolder, data_wippolder_gpkg, user_remote, force):
+    """Is a data item whose contents did not change only uploaded with 'force'?"""
+    (data_local := copy(data_wippolder_gpkg)).description = "Local description"
+    (case_local := case_wippolder.shallow_clone()).add_data(data_local)
+    (case_remote := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    diff_all = make_index(case_local).diff(make_index(case_remote))
+    assert [d.member for d in diff_all] == ["description"]
+    data_to_upload, data_to_delete = _select_push(diff_all, force=force)
+    casespec = CaseSpec(CaseName("wippolder"), DataName("wippolder.gpkg"))
+    assert data_to_upload == ({casespec} if force else set())
+    assert data_to_delete == set()
+
+
+def test_push_modified_content(
+    case_wippolder, data_wippolder_gpkg, data_wippolder_gpkg_modified
+):
+    """Is a data item whose contents changed uploaded without 'force'?"""
+    (case_local := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    (case_remote := case_wippolder.shallow_clone()).add_data(
+        data_wippolder_gpkg_modified
+    )
+    diff_all = make_index(case_local).diff(make_index(case_remote))
+    data_to_upload, data_to_delete = _select_push(diff_all)
+    assert data_to_upload == {
+        CaseSpec(CaseName("wippolder"), DataName("wippolder.gpkg"))
+    }
+    assert data_to_delete == set()
+
+
 def test_format_indexdiffs(
     case_wippolder,
     data_wippolder_gpkg,
     data_wippolder_gpkg_modified,
 ):
-    (case_local := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg)
-    (case_remote := deepcopy(case_wippolder)).add_data(data_wippolder_gpkg_modified)
-    (index_local := Index()).add_case(case_local)
-    (index_remote := Index()).add_case(case_remote)
+    (case_local := case_wippolder.shallow_clone()).add_data(data_wippolder_gpkg)
+    (case_remote := case_wippolder.shallow_clone()).add_data(
+        data_wippolder_gpkg_modified
+    )
+    index_local = make_index(case_local)
+    index_remote = make_index(case_remote)
     diff_all = index_local.diff(index_remote)
     diff_all_formatted = format_indexdiffs(diff_all, push=True)
     print()
     print(diff_all_formatted)
 
 
-# def test_push_debug():
-#     repo = Repository(
-#         path="/home/balazs/Development/geodepot/tests/data/integration/client1/.geodepot"
-#     )
-#     diff_all = repo.fetch(RemoteName("ssh"))
-#     repo.push(RemoteName("ssh"), diff_all)
+@pytest.mark.skipif(
+    os.environ.get("GEODEPOT_SSH_REPOSITORY") is None,
+    reason="Requires a repository with an 'ssh' remote in GEODEPOT_SSH_REPOSITORY",
+)
+def test_push_debug():
+    repo = Repository(path=os.environ["GEODEPOT_SSH_REPOSITORY"])
+    diff_all = repo.fetch(RemoteName("ssh"))
+    repo.push(RemoteName("ssh"), diff_all)
 
 
 # def test_format_indexdiffs_debug():